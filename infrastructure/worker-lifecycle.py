@@ -1,39 +1,26 @@
 import os
-import subprocess
-import time
+import sys
 
 # CONFIGURATION
 DOCKER_IMAGE = "gcr.io/your-project/transcoder:latest"
 
+# Runs under worker.service: systemd orders us after network-online.target
+# and docker.service, and powers the VM off (ExecStopPost) once we exit.
+
 def run_worker():
-    print("Starting Worker Container...")
-    
-    try:
-        # Run Docker in the foreground. Script BLOCKS here until Docker exits.
-        # We pass the GPU flag and mapped volumes.
-        subprocess.run([
-            "docker", "run", "--rm",
-            "--gpus", "all",
-            "-v", "/tmp:/tmp",
-            # We don't pass input/output args here because 
-            # the container will pull them from Pub/Sub itself.
-            DOCKER_IMAGE
-        ], check=True)
-        
-        print("Container finished successfully.")
-        
-    except subprocess.CalledProcessError:
-        print("Container crashed or failed!")
-        # Optional: Send an alert to logging here
-        
-    finally:
-        # Whether success or failure, we SHUT DOWN.
-        print("Shutting down VM...")
-        # Give logs a moment to flush
-        time.sleep(5) 
-        os.system("sudo shutdown -h now")
+    print("Starting Worker Container...", flush=True)
+
+    # Replace this Python process with docker itself (no parent left waiting).
+    # Docker's exit code becomes the unit's exit code; systemd handles shutdown.
+    # We pass the GPU flag and mapped volumes.
+    os.execvp("docker", [
+        "docker", "run", "--rm",
+        "--gpus", "all",
+        "-v", "/tmp:/tmp",
+        # We don't pass input/output args here because 
+        # the container will pull them from Pub/Sub itself.
+        DOCKER_IMAGE
+    ])
 
 if __name__ == "__main__":
-    # Optional: Wait 10s for networking/drivers to settle before starting
-    time.sleep(10)
-    run_worker()
\ No newline at end of file
+    sys.exit(run_worker())
@@ -1,14 +1,21 @@
 #!/usr/bin/env python3
 import argparse
 import sys
-import json
+import orjson
 import os
-from pathlib import Path
+from functools import lru_cache
+from typing import List, Literal, Optional
 from datetime import datetime, timezone
-from google.cloud import storage
-import dateutil.parser 
 from google import genai
 from google.genai import types
+from pydantic import BaseModel
+
+from analysisCommon import get_bucket, parse_iso_cached
+
+@lru_cache(maxsize=1)
+def _get_genai_client():
+    return genai.Client(vertexai=True, location="us-central1")
+
 
 # ==========================================
 # 1. TIMELINE LOGIC
@@ -20,9 +27,7 @@ class GlobalTimeline:
         
         print("⏳ Synchronizing timeline...")
         for clip in inputs:
-            dt = dateutil.parser.parse(clip['startTime'])
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
+            dt = parse_iso_cached(clip['startTime'])
             timestamps.append(dt)
             
             gs_uri = f"gs://{bucket_name}/{clip['path']}"
@@ -45,43 +50,35 @@ class GlobalTimeline:
 # ==========================================
 # 2. CORE JOB LOGIC
 # ==========================================
-def run_analysis_job(payload_json_str, workdir_str="/workspace"):
-    
-    # 1. Parse Payload
-    try:
-        payload = json.loads(payload_json_str)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Invalid JSON Payload: {e}")
+# Response schema: Gemini decodes straight into this shape (constrained
+# decoding), so the output is always well-formed and carries no extra keys.
+class Roles(BaseModel):
+    wide_index: int
+    close_up_primary_index: Optional[int] = None
+    close_up_secondary_index: Optional[int] = None
 
-    bucket_name = payload.get("bucket")
-    inputs = payload.get("inputs", [])
-    production_id = payload.get("productionId")
-    
-    workdir = Path(workdir_str).resolve()
-    workdir.mkdir(parents=True, exist_ok=True)
-    storage_client = storage.Client()
 
-    print(f"🧠 Starting AI Analysis for Production: {production_id}")
+class Decision(BaseModel):
+    timestamp_global: str
+    event_phase: Literal["ACTION", "REACTION"]
+    camera_index: int
+    reason: str
+    visual_cue: Optional[str] = None
 
-    # 2. Initialize Timeline
-    timeline = GlobalTimeline(inputs, bucket_name)
-    ai_context = timeline.get_context_for_ai()
-    
-    # 3. SETUP GENAI CLIENT
-    client = genai.Client(vertexai=True, location="us-central1")
-    
-    print(f"🤖 Invoking Gemini 2.0 Flash on {len(timeline.clips)} files...")
-    
-    # 4. Prepare Content
-    contents = []
-    
-    # === UPDATED PROMPT: SPATIAL AWARENESS ===
-    prompt_text = f"""
+
+class AnalysisOut(BaseModel):
+    roles: Roles
+    decisions: List[Decision]
+
+
+# === UPDATED PROMPT: SPATIAL AWARENESS ===
+# Built once at import; filled per job with n (clip count) and t0 (match start)
+_PROMPT_TMPL = """
     You are a Motion Detection Analyst.
-    I have provided {len(timeline.clips)} video inputs.
+    I have provided {n} video inputs.
     
     TIMING CONTEXT:
-    - T=0: {ai_context['match_start']}
+    - T=0: {t0}
     
     THE PROBLEM:
     Do NOT look for the ball. It is too small.
@@ -133,6 +130,39 @@ def run_analysis_job(payload_json_str, workdir_str="/workspace"):
       ]
     }}
     """
+
+def run_analysis_job(payload_json_str, workdir_str="/workspace"):
+    # workdir_str is accepted for launcher compatibility; nothing is staged
+    # locally since the result uploads straight from memory.
+
+    # 1. Parse Payload
+    try:
+        payload = orjson.loads(payload_json_str)
+    except orjson.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON Payload: {e}")
+
+    bucket_name = payload.get("bucket")
+    inputs = payload.get("inputs", [])
+    production_id = payload.get("productionId")
+    
+    print(f"🧠 Starting AI Analysis for Production: {production_id}")
+
+    # 2. Initialize Timeline
+    timeline = GlobalTimeline(inputs, bucket_name)
+    ai_context = timeline.get_context_for_ai()
+    
+    # 3. SETUP GENAI CLIENT
+    client = _get_genai_client()
+    
+    print(f"🤖 Invoking Gemini 2.0 Flash on {len(timeline.clips)} files...")
+    
+    # 4. Prepare Content
+    contents = []
+    
+    prompt_text = _PROMPT_TMPL.format(
+        n=len(timeline.clips),
+        t0=ai_context['match_start'],
+    )
     contents.append(prompt_text)
     
     # Attach Videos
@@ -153,12 +183,16 @@ def run_analysis_job(payload_json_str, workdir_str="/workspace"):
             contents=contents,
             config=types.GenerateContentConfig(
                 response_mime_type="application/json",
+                response_schema=AnalysisOut,
                 temperature=0.1
             )
         )
         
         # 6. Process Response
-        ai_data = json.loads(response.text)
+        if response.parsed is not None:
+            ai_data = response.parsed.model_dump(exclude_none=True)
+        else:
+            ai_data = orjson.loads(response.text)
         print("   - Received JSON. Mapping indexes to URIs...")
         
         # Map Roles
@@ -186,17 +220,14 @@ def run_analysis_job(payload_json_str, workdir_str="/workspace"):
         final_result = {"error": str(e)}
 
     # 7. Save & Upload
-    output_filename = f"analysis_{production_id}.json"
-    local_output_path = workdir / output_filename
-    
-    with open(local_output_path, 'w') as f:
-        json.dump(final_result, f, indent=2)
+    # Serialized straight to the upload; no local file round-trip
+    data = orjson.dumps(final_result)
 
     gcs_output_path = f"productions/{production_id}/analysis.json"
     
     print(f"⬆️ Uploading results to gs://{bucket_name}/{gcs_output_path}...")
-    blob = storage_client.bucket(bucket_name).blob(gcs_output_path)
-    blob.upload_from_filename(str(local_output_path))
+    blob = get_bucket(bucket_name).blob(gcs_output_path)
+    blob.upload_from_string(data, content_type="application/json")
 
     print(f"✅ Job Complete.")
 
@@ -1,15 +1,24 @@
 #!/usr/bin/env python3
 import argparse
 import sys
-import json
+import orjson
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
-from datetime import datetime, timezone
-from google.cloud import storage
-import dateutil.parser 
 from google import genai
 from google.genai import types
 
+from analysisCommon import parse_iso_cached
+
+# One client per process: construction does auth discovery and opens a new
+# gRPC channel, so reuse it instead of building one per job.
+@lru_cache(maxsize=1)
+def _get_genai_client():
+    return genai.Client(vertexai=True, location="us-central1")
+
+
 # ==========================================
 # 1. TIMELINE LOGIC
 # ==========================================
@@ -20,9 +29,7 @@ class GlobalTimeline:
         
         print("⏳ Synchronizing timeline...")
         for clip in inputs:
-            dt = dateutil.parser.parse(clip['startTime'])
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
+            dt = parse_iso_cached(clip['startTime'])
             timestamps.append(dt)
             
             gs_uri = f"gs://{bucket_name}/{clip['path']}"
@@ -38,85 +45,188 @@ class GlobalTimeline:
 # ==========================================
 # 2. AUDIT LOGIC
 # ==========================================
+_print_lock = threading.Lock()
+
+# Prompts are built once at import, not per clip / per job
+_AUDIT_PROMPT = """
+    You are auditing a single video file from a tennis match.
+    
+    TASK 1: IDENTIFY VIEW
+    - Is this a "WIDE" shot (full court visible)?
+    - Is this a "CLOSE-UP" (only one player visible)?
+    
+    TASK 2: PHYSICS LOG (Seconds)
+    - List the timestamp (in seconds from 00:00) of EVERY racquet contact you see.
+    - If you see a rally, list the Start (Serve) and End (last shot).
+    
+    CRITICAL:
+    - Be precise. If the rally lasts 15 seconds, your Start and End must be 15 seconds apart.
+    
+    JSON OUTPUT FORMAT:
+    {
+      "camera_type": "WIDE",
+      "visible_events": [
+         {"time_sec": 12.5, "action": "Serve"},
+         {"time_sec": 27.0, "action": "Point End (Net)"}
+      ]
+    }
+    """
+
+_AUDIT_BATCH_PROMPT_TMPL = """
+    You are auditing {n} video files from the same tennis match,
+    labelled VIDEO 0 to VIDEO {last} below. Audit each video on its own.
+    
+    TASK 1: IDENTIFY VIEW
+    - Is this a "WIDE" shot (full court visible)?
+    - Is this a "CLOSE-UP" (only one player visible)?
+    
+    TASK 2: PHYSICS LOG (Seconds)
+    - List the timestamp (in seconds from 00:00 of THAT video) of EVERY racquet contact you see.
+    - If you see a rally, list the Start (Serve) and End (last shot).
+    
+    CRITICAL:
+    - Be precise. If the rally lasts 15 seconds, your Start and End must be 15 seconds apart.
+    - Emit exactly one object per video in "results", in video order.
+    
+    JSON OUTPUT FORMAT:
+    {{
+      "results": [
+        {{
+          "video_index": 0,
+          "camera_type": "WIDE",
+          "visible_events": [
+             {{"time_sec": 12.5, "action": "Serve"}},
+             {{"time_sec": 27.0, "action": "Point End (Net)"}}
+          ]
+        }}
+      ]
+    }}
+    """
+
+
+def _audit_one(client, i, clip):
+    """
+    Runs the Gemini audit for a single clip.
+    Returns {"index", "gs_uri", "data"} or {"index", "gs_uri", "error"}.
+    """
+    # 1. Prepare Single Video Content
+    contents = []
+    video_part = types.Part.from_uri(
+        file_uri=clip['gs_uri'],
+        mime_type="video/mp4"
+    )
+    
+    contents.append(_AUDIT_PROMPT)
+    contents.append(video_part)
+
+    # 2. Call Gemini (errors stay per-clip so one failure doesn't poison the pool)
+    try:
+        response = client.models.generate_content(
+            model="gemini-2.5-pro",
+            contents=contents,
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                temperature=0.1
+            )
+        )
+        return {"index": i, "gs_uri": clip['gs_uri'], "data": orjson.loads(response.text)}
+    except Exception as e:
+        return {"index": i, "gs_uri": clip['gs_uri'], "error": e}
+
+
+def _audit_batch(client, clips):
+    """
+    Audits every clip in ONE Gemini call. Videos are labelled VIDEO 0..N-1
+    and the model returns one result per video, tagged with video_index.
+    Returns the same result dicts as _audit_one, or None if the response
+    doesn't line up with the inputs (caller falls back to per-clip).
+    """
+    prompt_text = _AUDIT_BATCH_PROMPT_TMPL.format(n=len(clips), last=len(clips) - 1)
+
+    contents = [prompt_text]
+    for i, clip in enumerate(clips):
+        contents.append(f"VIDEO {i}:")
+        contents.append(types.Part.from_uri(file_uri=clip['gs_uri'], mime_type="video/mp4"))
+
+    try:
+        response = client.models.generate_content(
+            model="gemini-2.5-pro",
+            contents=contents,
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                temperature=0.1
+            )
+        )
+        results = orjson.loads(response.text).get("results", [])
+    except Exception as e:
+        print(f"⚠️ Batched audit failed ({e}). Falling back to per-clip calls.")
+        return None
+
+    # Key by the model's video_index rather than list position; a dropped
+    # or duplicated entry would otherwise shift every later clip's result.
+    by_index = {}
+    for data in results:
+        idx = data.get("video_index") if isinstance(data, dict) else None
+        if isinstance(idx, int) and idx not in by_index:
+            by_index[idx] = data
+    if len(results) != len(clips) or set(by_index) != set(range(len(clips))):
+        print(f"⚠️ Batched audit returned indexes {sorted(by_index)} for {len(clips)} clips. Falling back to per-clip calls.")
+        return None
+
+    return [
+        {"index": i, "gs_uri": clip['gs_uri'], "data": by_index[i]}
+        for i, clip in enumerate(clips)
+    ]
+
+
+def _print_audit_result(result):
+    i = result["index"]
+    with _print_lock:
+        print(f"\n🎥 CLIP {i}: {result['gs_uri']}")
+
+        if "error" in result:
+            print(f"   ❌ Error analyzing clip {i}: {result['error']}")
+            return
+
+        data = result["data"]
+        print(f"   ✅ View Type: {data.get('camera_type')}")
+        
+        events = data.get("visible_events", [])
+        if not events:
+            print("   ⚠️ No events detected.")
+        else:
+            for event in events:
+                print(f"      - {event.get('time_sec')}s: {event.get('action')}")
+
+
 def run_audit_job(payload_json_str):
     try:
-        payload = json.loads(payload_json_str)
-    except json.JSONDecodeError as e:
+        payload = orjson.loads(payload_json_str)
+    except orjson.JSONDecodeError as e:
         raise ValueError(f"Invalid JSON Payload: {e}")
 
     bucket_name = payload.get("bucket")
     inputs = payload.get("inputs", [])
     production_id = payload.get("productionId")
     
-    storage_client = storage.Client()
     timeline = GlobalTimeline(inputs, bucket_name)
-    client = genai.Client(vertexai=True, location="us-central1")
+    client = _get_genai_client()
     
     print(f"🕵️ STARTING INDIVIDUAL AUDIT for {production_id}")
     print("------------------------------------------------")
 
-    # === LOOP THROUGH EACH CLIP INDIVIDUALLY ===
-    for i, clip in enumerate(timeline.clips):
-        print(f"\n🎥 ANALYZING CLIP {i}: {clip['gs_uri']}")
-        
-        # 1. Prepare Single Video Content
-        contents = []
-        video_part = types.Part.from_uri(
-            file_uri=clip['gs_uri'],
-            mime_type="video/mp4"
-        )
-        
-        prompt_text = """
-        You are auditing a single video file from a tennis match.
-        
-        TASK 1: IDENTIFY VIEW
-        - Is this a "WIDE" shot (full court visible)?
-        - Is this a "CLOSE-UP" (only one player visible)?
-        
-        TASK 2: PHYSICS LOG (Seconds)
-        - List the timestamp (in seconds from 00:00) of EVERY racquet contact you see.
-        - If you see a rally, list the Start (Serve) and End (last shot).
-        
-        CRITICAL:
-        - Be precise. If the rally lasts 15 seconds, your Start and End must be 15 seconds apart.
-        
-        JSON OUTPUT FORMAT:
-        {
-          "camera_type": "WIDE",
-          "visible_events": [
-             {"time_sec": 12.5, "action": "Serve"},
-             {"time_sec": 27.0, "action": "Point End (Net)"}
-          ]
-        }
-        """
-        
-        contents.append(prompt_text)
-        contents.append(video_part)
-
-        # 2. Call Gemini
-        try:
-            response = client.models.generate_content(
-                model="gemini-2.5-pro",
-                contents=contents,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    temperature=0.1
-                )
-            )
-            
-            # 3. Print Result Immediately
-            data = json.loads(response.text)
-            print(f"   ✅ View Type: {data.get('camera_type')}")
-            
-            events = data.get("visible_events", [])
-            if not events:
-                print("   ⚠️ No events detected.")
-            else:
-                for event in events:
-                    print(f"      - {event.get('time_sec')}s: {event.get('action')}")
-                    
-        except Exception as e:
-            print(f"   ❌ Error analyzing clip {i}: {e}")
+    # === AUDIT ALL CLIPS IN ONE CALL ===
+    clips = timeline.clips
+    batch = _audit_batch(client, clips) if clips else []
+    if batch is not None:
+        for result in batch:
+            _print_audit_result(result)
+    else:
+        # Per-clip fallback, concurrent (independent Gemini round-trips)
+        with ThreadPoolExecutor(max_workers=min(8, len(clips))) as ex:
+            futures = [ex.submit(_audit_one, client, i, clip) for i, clip in enumerate(clips)]
+            for future in as_completed(futures):
+                _print_audit_result(future.result())
 
     print("\n------------------------------------------------")
     print("✅ Audit Complete.")
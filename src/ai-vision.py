@@ -1,13 +1,18 @@
 #!/usr/bin/env python3
 import argparse
+import atexit
 import sys
-import json
+import orjson
+import time
 import cv2
 import numpy as np
+from numba import njit, prange
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
-from google.cloud import storage
-import dateutil.parser 
+from google.cloud.storage import transfer_manager
+
+from analysisCommon import get_bucket, parse_iso_cached
 
 # ==========================================
 # CONFIGURATION
@@ -27,13 +32,86 @@ MIN_RALLY_DURATION = 2.0  # Was 3.0. Lowered to catch the 19s-21s point.
 # Merge Gap = How long they must stand still to trigger a "Cut"
 MERGE_GAP = 2.0           # If action stops for 3s, we cut to close-up.
 
+# Sampled frames diffed per vectorized batch (~60 MB of 640x360 uint8)
+MOTION_CHUNK = 256
+
 
 # ==========================================
 # 1. MOTION DETECTOR
 # ==========================================
-def analyze_motion_energy(video_path):
-    print(f"👁️  Scanning pixels in: {video_path}")
-    cap = cv2.VideoCapture(video_path)
+def _open_cuda_reader(video_path):
+    """
+    Returns a cv2.cudacodec reader when OpenCV was built with CUDA + NVCUVID
+    and a GPU is visible, else None.
+    """
+    if not hasattr(cv2, "cudacodec"):
+        return None
+    try:
+        if cv2.cuda.getCudaEnabledDeviceCount() == 0:
+            return None
+        return cv2.cudacodec.createVideoReader(video_path)
+    except cv2.error as e:
+        print(f"⚠️ NVDEC unavailable, using CPU decode: {e}")
+        return None
+
+def _analyze_motion_energy_cuda(reader, fps, sample_rate, process_width, process_height):
+    """
+    Same scoring as the CPU path, but decode, grayscale, resize, blur and
+    frame delta all stay on the GPU. Only one scalar per sample is downloaded.
+    """
+    blur = cv2.cuda.createGaussianFilter(cv2.CV_8UC1, cv2.CV_8UC1, (21, 21), 0)
+    prev_gpu = None
+    motion_timeline = []
+
+    frame_idx = 0
+    while True:
+        if frame_idx % sample_rate != 0:
+            if not reader.grab(): break
+            frame_idx += 1
+            continue
+
+        ok, gpu_frame = reader.nextFrame()
+        if not ok: break
+
+        # cudacodec emits BGRA
+        gpu_gray = cv2.cuda.cvtColor(gpu_frame, cv2.COLOR_BGRA2GRAY)
+        gpu_small = cv2.cuda.resize(gpu_gray, (process_width, process_height))
+        gpu_small = blur.apply(gpu_small)
+
+        if prev_gpu is not None:
+            delta = cv2.cuda.absdiff(prev_gpu, gpu_small)
+            _, thresh = cv2.cuda.threshold(delta, 25, 255, cv2.THRESH_BINARY)
+            motion_score = cv2.cuda.sum(thresh)[0] / (process_width * process_height)
+            motion_timeline.append((frame_idx / fps, motion_score > MOTION_THRESHOLD))
+
+        prev_gpu = gpu_small
+        frame_idx += 1
+
+    return motion_timeline
+
+@njit(cache=True, parallel=True)
+def _score_chunk(buf, filled, thresh):
+    """
+    Motion score of each buf[k] vs buf[k-1], k in 1..filled-1.
+    Same as sum(threshold(absdiff, thresh, 255)) / (W*H), but one fused
+    native pass per frame pair with no diff/mask temporaries.
+    """
+    h, w = buf.shape[1], buf.shape[2]
+    scores = np.empty(filled - 1, dtype=np.float64)
+    for k in prange(1, filled):
+        count = 0
+        for y in range(h):
+            for x in range(w):
+                d = np.int16(buf[k, y, x]) - np.int16(buf[k - 1, y, x])
+                if d > thresh or d < -thresh:
+                    count += 1
+        scores[k - 1] = count * 255.0 / (h * w)
+    return scores
+
+def analyze_motion_energy(video_path, cap=None):
+    print(f"👁️  Scanning pixels in: {video_path.split('?')[0]}")  # never log URL signatures
+    if cap is None:
+        cap = cv2.VideoCapture(video_path)
     
     if not cap.isOpened():
         raise ValueError("Could not open video")
@@ -46,103 +124,100 @@ def analyze_motion_energy(video_path):
     
     # We will sample every Nth frame to be fast
     sample_rate = 5 # Check every 5th frame
-    prev_frame = None
     motion_timeline = [] # (timestamp, is_moving)
     
     # Resize for speed
     process_width = 640 
     process_height = 360
 
+    # NVDEC path (OpenCV built with cudacodec); CPU decode otherwise
+    reader = _open_cuda_reader(video_path)
+    if reader is not None:
+        cap.release()
+        print("   - Using NVDEC (cv2.cudacodec) decode")
+        return _analyze_motion_energy_cuda(reader, fps, sample_rate, process_width, process_height)
+
+    # Sampled frames are stacked into one buffer and scored by one compiled
+    # pass per chunk. Row 0 carries the previous chunk's last frame.
+    buf = np.empty((MOTION_CHUNK + 1, process_height, process_width), dtype=np.uint8)
+    buf_times = np.empty(MOTION_CHUNK + 1, dtype=np.float64)
+    filled = 0
+
+    def flush(filled):
+        if filled < 2:
+            return filled
+        scores = _score_chunk(buf, filled, 25)
+        moving = scores > MOTION_THRESHOLD
+        motion_timeline.extend(zip(buf_times[1:filled].tolist(), moving.tolist()))
+        buf[0] = buf[filled - 1]
+        buf_times[0] = buf_times[filled - 1]
+        return 1
+
     frame_idx = 0
     while True:
+        # Skipped frames are only grabbed: no BGR conversion or copy out
+        if frame_idx % sample_rate != 0:
+            if not cap.grab(): break
+            frame_idx += 1
+            continue
+
         ret, frame = cap.read()
         if not ret: break
-        
-        if frame_idx % sample_rate == 0:
-            # 1. Grayscale & Blur
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            gray = cv2.resize(gray, (process_width, process_height))
-            gray = cv2.GaussianBlur(gray, (21, 21), 0)
-            
-            if prev_frame is None:
-                prev_frame = gray
-                frame_idx += 1
-                continue
-                
-            # 2. Frame Delta (Absolute difference)
-            delta_frame = cv2.absdiff(prev_frame, gray)
-            thresh = cv2.threshold(delta_frame, 25, 255, cv2.THRESH_BINARY)[1]
-            
-            # 3. Calculate "Motion Score" (Percentage of white pixels)
-            motion_score = np.sum(thresh) / (process_width * process_height)
-            
-            # 4. Save Logic
-            current_time = frame_idx / fps
-            is_moving = motion_score > MOTION_THRESHOLD
-            motion_timeline.append((current_time, is_moving))
-            
-            prev_frame = gray
-            
+
+        # 1. Grayscale & Blur
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        gray = cv2.resize(gray, (process_width, process_height))
+        cv2.GaussianBlur(gray, (21, 21), 0, dst=buf[filled])
+        buf_times[filled] = frame_idx / fps
+        filled += 1
+
+        # 2. Frame Delta + Motion Score, batched
+        if filled == MOTION_CHUNK + 1:
+            filled = flush(filled)
+
         frame_idx += 1
         
     cap.release()
+    flush(filled)
     return motion_timeline
 
 def process_timeline(motion_data):
     """
     Converts raw (time, moving) tuples into clean (start, end) intervals.
     """
-    intervals = []
-    in_rally = False
-    start_time = 0
-    
-    # 1. Raw Pass
-    raw_blocks = []
-    curr_start = None
-    
-    for t, moving in motion_data:
-        if moving and not in_rally:
-            in_rally = True
-            curr_start = t
-        elif not moving and in_rally:
-            in_rally = False
-            raw_blocks.append((curr_start, t))
-            
-    if in_rally: raw_blocks.append((curr_start, motion_data[-1][0]))
+    if not motion_data: return []
 
-    if not raw_blocks: return []
+    data = np.asarray(motion_data, dtype=np.float64)
+    times, moving = data[:, 0], data[:, 1] > 0
 
-    # 2. Merge Pass (Stitch together short gaps)
-    merged = []
-    if raw_blocks:
-        curr_s, curr_e = raw_blocks[0]
-        
-        for next_s, next_e in raw_blocks[1:]:
-            gap = next_s - curr_e
-            if gap < MERGE_GAP:
-                # Merge them
-                curr_e = next_e
-            else:
-                # Save and start new
-                merged.append((curr_s, curr_e))
-                curr_s, curr_e = next_s, next_e
-        merged.append((curr_s, curr_e))
+    # 1. Raw Pass: run-length edges of the moving mask.
+    # A block ends at the first still sample (or the last sample if it runs to the end).
+    edges = np.diff(np.r_[False, moving, False].astype(np.int8))
+    starts = times[np.flatnonzero(edges == 1)]
+    ends = times[np.minimum(np.flatnonzero(edges == -1), len(times) - 1)]
+
+    if len(starts) == 0: return []
+
+    # 2. Merge Pass (Stitch together short gaps): split only where gap >= MERGE_GAP
+    breaks = np.flatnonzero(starts[1:] - ends[:-1] >= MERGE_GAP)
+    merged_s = starts[np.r_[0, breaks + 1]]
+    merged_e = ends[np.r_[breaks, len(ends) - 1]]
 
     # 3. Filter Pass (Remove accidental bumps)
-    final_intervals = [
-        (s, e) for s, e in merged 
-        if (e - s) > MIN_RALLY_DURATION
-    ]
+    keep = (merged_e - merged_s) > MIN_RALLY_DURATION
     
-    return final_intervals
+    return list(zip(merged_s[keep].tolist(), merged_e[keep].tolist()))
 
 # ==========================================
 # 2. MAIN JOB LOGIC
 # ==========================================
+def _signed_master_url(blob):
+    return blob.generate_signed_url(version="v4", expiration=timedelta(hours=1), method="GET")
+
 def run_vision_job(payload_json_str, workdir_str="/workspace"):
     try:
-        payload = json.loads(payload_json_str)
-    except json.JSONDecodeError as e:
+        payload = orjson.loads(payload_json_str)
+    except orjson.JSONDecodeError as e:
         raise ValueError(f"Invalid JSON Payload: {e}")
 
     bucket_name = payload.get("bucket")
@@ -151,24 +226,45 @@ def run_vision_job(payload_json_str, workdir_str="/workspace"):
     
     workdir = Path(workdir_str).resolve()
     workdir.mkdir(parents=True, exist_ok=True)
-    storage_client = storage.Client()
     
-    # 1. Download Wide Master (Clip 1)
-    # We assume inputs are synced. We only need to download ONE file to analyze timing.
-    # Note: This requires the file to be present locally.
-    # If using GCS URIs, we must download first.
+    # 1. Stream Wide Master (Clip 1)
+    # We assume inputs are synced. We only need ONE file to analyze timing.
+    # OpenCV's FFmpeg backend can read straight from a signed HTTPS URL, so
+    # decode starts immediately instead of waiting for the full download.
     
-    print(f"📥 Downloading Master Clip for Vision Analysis...")
+    print(f"📡 Opening Master Clip for Vision Analysis...")
     master_input = inputs[CAM_WIDE] # Index 1
     blob_path = master_input['path']
     local_video_path = workdir / "master_temp.mp4"
     
-    blob = storage_client.bucket(bucket_name).blob(blob_path)
-    blob.download_to_filename(str(local_video_path))
-    print("   - Download complete.")
+    blob = get_bucket(bucket_name).blob(blob_path)
     
     # 2. Run Vision Analysis
-    raw_motion = analyze_motion_energy(str(local_video_path))
+    # Only signing and opening the stream fall back to a download; errors
+    # from the analysis itself propagate.
+    cap = None
+    try:
+        video_path = _signed_master_url(blob)
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError("Could not open signed URL stream")
+    except Exception as e:
+        # No signing credentials (e.g. GCE metadata creds) or no HTTP support in
+        # this OpenCV build -> fall back to download-then-open.
+        if cap is not None:
+            cap.release()
+        cap = None
+        print(f"⚠️ Streaming unavailable ({e}). Downloading master instead...")
+        # Parallel range-GET chunks instead of one sequential stream
+        transfer_manager.download_chunks_concurrently(
+            blob, str(local_video_path),
+            chunk_size=32 * 1024 * 1024, max_workers=8,
+            worker_type=transfer_manager.THREAD,
+        )
+        print("   - Download complete.")
+        video_path = str(local_video_path)
+
+    raw_motion = analyze_motion_energy(video_path, cap)
     rally_intervals = process_timeline(raw_motion)
     
     print(f"✅ DETECTED {len(rally_intervals)} RALLIES:")
@@ -177,8 +273,7 @@ def run_vision_job(payload_json_str, workdir_str="/workspace"):
 
     # 3. Build EDL (Global Timeline)
     # We need Global Zero to map the relative seconds back to ISO time
-    timeline_start = dateutil.parser.parse(master_input['startTime'])
-    if timeline_start.tzinfo is None: timeline_start = timeline_start.replace(tzinfo=timezone.utc)
+    timeline_start = parse_iso_cached(master_input['startTime'])
     
     # Find Global Zero across all clips just in case (assuming sync)
     global_zero = timeline_start 
@@ -235,19 +330,51 @@ def run_vision_job(payload_json_str, workdir_str="/workspace"):
         }
     }
     
-    output_filename = f"analysis_{production_id}.json"
-    local_output_path = workdir / output_filename
-    with open(local_output_path, 'w') as f:
-        json.dump(final_output, f, indent=2)
+    # Serialized straight to the upload; no local file round-trip
+    data = orjson.dumps(final_output, option=orjson.OPT_SERIALIZE_NUMPY)
 
     gcs_output_path = f"productions/{production_id}/analysis.json"
     print(f"⬆️ Uploading results...")
-    storage_client.bucket(bucket_name).blob(gcs_output_path).upload_from_filename(str(local_output_path))
-    print(f"✅ Vision Job Complete.")
+    _upload_async(get_bucket(bucket_name).blob(gcs_output_path), data)
     
-    # Cleanup
+    # Cleanup (overlaps the upload)
     local_video_path.unlink(missing_ok=True)
 
+# ==========================================
+# 3. UPLOAD
+# ==========================================
+# Result uploads run in the background so local cleanup overlaps the GCS
+# write; main() drains them before exiting so failures still surface.
+_UPLOAD_POOL = ThreadPoolExecutor(max_workers=4)
+_PENDING_UPLOADS = []
+atexit.register(_UPLOAD_POOL.shutdown, wait=True)
+
+
+def _upload_with_retry(blob, data, attempts=3):
+    for attempt in range(attempts):
+        try:
+            blob.upload_from_string(data, content_type="application/json")
+            print(f"✅ Uploaded gs://{blob.bucket.name}/{blob.name}")
+            return
+        except Exception as e:
+            if attempt == attempts - 1:
+                raise
+            delay = 2 ** attempt
+            print(f"⚠️ Upload failed ({e}), retrying in {delay}s...")
+            time.sleep(delay)
+
+
+def _upload_async(blob, data):
+    future = _UPLOAD_POOL.submit(_upload_with_retry, blob, data)
+    _PENDING_UPLOADS.append(future)
+    return future
+
+
+def _wait_for_uploads():
+    while _PENDING_UPLOADS:
+        _PENDING_UPLOADS.pop(0).result()
+
+
 def main():
     print(f"Vision is starting")
     parser = argparse.ArgumentParser()
@@ -255,6 +382,8 @@ def main():
     parser.add_argument("--workdir", default="/workspace")
     args = parser.parse_args()
     run_vision_job(args.payload, args.workdir)
+    _wait_for_uploads()
+    print(f"✅ Vision Job Complete.")
 
 if __name__ == "__main__":
     sys.exit(main())
\ No newline at end of file
@@ -1,33 +1,50 @@
 #!/usr/bin/env python3
 import argparse
+import atexit
 import sys
-import json
+import orjson
 import os
+import time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
+from typing import List
 from datetime import datetime, timezone, timedelta
-from collections import Counter
 
 import cv2
+import decord
 import numpy as np
-import dateutil.parser
+from numba import njit
 
-from google.cloud import storage
 from google import genai
 from google.genai import types
+from pydantic import BaseModel
+
+from analysisCommon import download_clips, get_bucket, parse_iso_cached
 
 # ==========================================
 # 0. CONFIG
 # ==========================================
 
-SAMPLE_TIMES = [1, 5, 10, 30]  # seconds
 DEFAULT_MODEL = "gemini-2.0-flash-001"
 
+# Gemini labeling: segments per request, concurrent requests
+LABEL_CHUNK_SIZE = 20
+LABEL_MAX_WORKERS = 4
+
 # Motion detection tuning
 MOTION_FPS_SAMPLE = 5          # sample frames at ~5 fps
 MOTION_DOWNSCALE_W = 320       # resize frames to reduce noise + cost
 MOTION_THRESHOLD = 18.0        # mean absdiff threshold (after downscale)
 MOTION_MIN_DURATION = 2.0      # seconds
 MOTION_SMOOTH_WINDOW = 5       # moving average window (samples)
+DECODE_BATCH = 64              # frames per decord get_batch call
+
+
+@lru_cache(maxsize=1)
+def _get_genai_client():
+    return genai.Client(vertexai=True, location="us-central1")
 
 
 # ==========================================
@@ -36,6 +53,120 @@ MOTION_SMOOTH_WINDOW = 5       # moving average window (samples)
 # ==========================================
 # 1. MOTION DETECTION (WORKING VERSION)
 # ==========================================
+def _open_cuda_reader(video_path):
+    """
+    Returns a cv2.cudacodec reader when OpenCV was built with CUDA + NVCUVID
+    and a GPU is visible, else None.
+    """
+    if not hasattr(cv2, "cudacodec"):
+        return None
+    try:
+        if cv2.cuda.getCudaEnabledDeviceCount() == 0:
+            return None
+        reader = cv2.cudacodec.createVideoReader(str(video_path))
+    except cv2.error as e:
+        print(f"⚠️ NVDEC unavailable, using CPU decode: {e}")
+        return None
+
+    # Have NVDEC emit BGR so frames skip the BGRA->BGR pass (OpenCV >= 4.7)
+    try:
+        reader.set(cv2.cudacodec.ColorFormat_BGR)
+    except (AttributeError, cv2.error):
+        pass
+    return reader
+
+
+def _iter_frames_cuda(reader, target_w, target_h, step):
+    # Decode + resize on the GPU; only the downscaled frame crosses PCIe.
+    frame_idx = 0
+    while True:
+        if frame_idx % step != 0:
+            if not reader.grab():
+                break
+            frame_idx += 1
+            continue
+        ok, gpu_frame = reader.nextFrame()
+        if not ok:
+            break
+        small = cv2.cuda.resize(gpu_frame, (target_w, target_h))
+        if small.channels() == 4:
+            # Older OpenCV builds ignore ColorFormat; convert the small frame
+            small = cv2.cuda.cvtColor(small, cv2.COLOR_BGRA2BGR)
+        yield frame_idx, small.download()
+        frame_idx += 1
+
+
+def _motion_sample_indices(vr, step):
+    """
+    Frame indices for the CPU motion pass. When keyframes are at least as
+    dense as the sample stride (short-GOP / intra-heavy encodes) only
+    keyframes are taken: each decodes on its own, so the frames in between
+    are never decoded. Otherwise a plain stride.
+    """
+    keys = vr.get_key_indices()
+    if len(keys) > 1 and np.median(np.diff(keys)) <= step:
+        picked = [keys[0]]
+        for k in keys[1:]:
+            if k - picked[-1] >= step:
+                picked.append(k)
+        return picked
+    return list(range(0, len(vr), step))
+
+
+def _iter_frames_decord(vr, idxs):
+    # Sample indices pulled DECODE_BATCH at a time into one contiguous
+    # ndarray by decord's threaded decoder (which also did the resize).
+    # Frames are RGB; MOG2 models each channel the same so order is moot.
+    for b in range(0, len(idxs), DECODE_BATCH):
+        chunk = idxs[b:b + DECODE_BATCH]
+        batch = vr.get_batch(chunk).asnumpy()
+        for frame_idx, frame in zip(chunk, batch):
+            yield frame_idx, frame
+
+
+@njit(cache=True)
+def _gated_area_sum(areas, min_area, max_area):
+    # Single pass over blob areas; index 0 is the background label.
+    total = 0.0
+    for i in range(1, areas.shape[0]):
+        a = areas[i]
+        if a > min_area and a < max_area:
+            total += a
+    return total
+
+
+@njit(cache=True)
+def _rally_segments(times, motion, thresh, min_dur, merge_gap):
+    """
+    One pass over the motion signal: runs above thresh become (start, end)
+    segments, ending at the first quiet sample (or the last sample); runs
+    shorter than min_dur are dropped and segments whose gap to the previous
+    one is <= merge_gap are merged into it. Returns a (K, 2) array.
+    """
+    n = motion.shape[0]
+    out = np.empty((n, 2), dtype=np.float64)
+    k = 0
+    i = 0
+    while i < n:
+        if motion[i] <= thresh:
+            i += 1
+            continue
+        j = i
+        while j < n and motion[j] > thresh:
+            j += 1
+        s = times[i]
+        e = times[min(j, n - 1)]
+        if e - s >= min_dur:
+            if k > 0 and s - out[k - 1, 1] <= merge_gap:
+                out[k - 1, 1] = e
+            else:
+                out[k, 0] = s
+                out[k, 1] = e
+                k += 1
+        i = j
+    return out[:k]
+
+
 def detect_rallies_mog2(
     video_path,
     motion_threshold=4.5,
@@ -44,49 +175,60 @@ def detect_rallies_mog2(
     target_w=640,
     target_h=360,
 ):
-    cap = cv2.VideoCapture(str(video_path))
-    if not cap.isOpened():
+    try:
+        # Decoder-side resize: frames come out at target size
+        vr = decord.VideoReader(str(video_path), width=target_w, height=target_h, num_threads=4)
+    except decord.DECORDError:
         print(f"❌ Failed to open {video_path}")
         return []
 
-    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    fps = vr.get_avg_fps() or 30.0
+    frame_count = len(vr)
+    # Analyze ~MOTION_FPS_SAMPLE frames per second, not every decoded frame
+    step = max(1, int(round(fps / MOTION_FPS_SAMPLE)))
 
+    reader = _open_cuda_reader(video_path)
+    if reader is not None:
+        frames = _iter_frames_cuda(reader, target_w, target_h, step)
+    else:
+        idxs = _motion_sample_indices(vr, step)
+        frames = _iter_frames_decord(vr, idxs)
+
+    # Keep the background model's time window the same as at full frame rate
     fgbg = cv2.createBackgroundSubtractorMOG2(
-        history=200,
+        history=max(1, 200 // step),
         varThreshold=50,
         detectShadows=False
     )
 
-    motion_signal = []
-    times = []
+    # Preallocated from the container's frame count; grown if the metadata
+    # undercounts, truncated to the samples actually read.
+    capacity = max(1, frame_count // step + 1)
+    motion_signal = np.empty(capacity, dtype=np.float64)
+    times = np.empty(capacity, dtype=np.float64)
+    n = 0
 
-    t = 0.0
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3,3))
+    max_blob_area = target_w * target_h * 0.6
 
-        frame = cv2.resize(frame, (target_w, target_h))
+    for frame_idx, frame in frames:
         fgmask = fgbg.apply(frame)
-
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3,3))
         fgmask = cv2.morphologyEx(fgmask, cv2.MORPH_OPEN, kernel)
 
-        contours, _ = cv2.findContours(fgmask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        total_area = 0.0
-        for c in contours:
-            area = cv2.contourArea(c)
-            if 150 < area < (target_w * target_h * 0.6):
-                total_area += area
+        # Blob areas in one C call (label 0 is background) instead of a
+        # Python loop over findContours results.
+        _, _, stats, _ = cv2.connectedComponentsWithStats(fgmask, connectivity=8)
+        total_area = _gated_area_sum(stats[:, cv2.CC_STAT_AREA], 150, max_blob_area)
 
-        motion_signal.append(total_area)
-        times.append(t)
-        t += 1.0 / fps
-
-    cap.release()
+        if n == len(motion_signal):
+            motion_signal = np.resize(motion_signal, 2 * n)
+            times = np.resize(times, 2 * n)
+        motion_signal[n] = total_area
+        times[n] = frame_idx / fps
+        n += 1
 
-    motion_signal = np.array(motion_signal)
+    motion_signal = motion_signal[:n]
+    times = times[:n]
     motion_norm = motion_signal / float(target_w * target_h)
 
     if len(motion_norm) == 0:
@@ -100,35 +242,11 @@ def detect_rallies_mog2(
         f"max={motion_norm.max():.4f}"
     )
 
-    active = motion_norm > (motion_threshold / 1000.0)
-
-    segments = []
-    start = None
-    for t, is_active in zip(times, active):
-        if is_active and start is None:
-            start = t
-        elif not is_active and start is not None:
-            if t - start >= min_rally_duration:
-                segments.append((start, t))
-            start = None
-
-    if start is not None:
-        end = times[-1]
-        if end - start >= min_rally_duration:
-            segments.append((start, end))
-
-    merged = []
-    for seg in segments:
-        if not merged:
-            merged.append(list(seg))
-        else:
-            prev = merged[-1]
-            if seg[0] - prev[1] <= merge_gap:
-                prev[1] = seg[1]
-            else:
-                merged.append(list(seg))
+    merged = _rally_segments(
+        times, motion_norm, motion_threshold / 1000.0, min_rally_duration, merge_gap
+    )
 
-    return [(round(s, 2), round(e, 2)) for s, e in merged]
+    return [(round(s, 2), round(e, 2)) for s, e in merged.tolist()]
 
 
 
@@ -136,20 +254,6 @@ def detect_rallies_mog2(
 # 2. PASS 1: CAMERA ROLE CLASSIFICATION
 # ==========================================
 
-def sample_frames(video_path, times):
-    cap = cv2.VideoCapture(str(video_path))
-    if not cap.isOpened():
-        return []
-    frames = []
-    for t in times:
-        cap.set(cv2.CAP_PROP_POS_MSEC, t * 1000)
-        ret, frame = cap.read()
-        if ret and frame is not None:
-            frames.append(frame)
-    cap.release()
-    return frames
-
-
 def classify_frame_simple(frame):
     """
     Placeholder heuristic.
@@ -160,14 +264,24 @@ def classify_frame_simple(frame):
     return "wide" if aspect > 1.3 else "closeup"
 
 
-def classify_camera_role(video_path):
-    frames = sample_frames(video_path, SAMPLE_TIMES)
-    votes = [classify_frame_simple(f) for f in frames if f is not None]
-    if not votes:
-        return "unknown", 0.0
-    counts = Counter(votes)
-    role, count = counts.most_common(1)[0]
-    return role, (count / float(len(votes)))
+def analyze_clip(video_path, **motion_kwargs):
+    """
+    Role + motion for one clip in one worker. classify_frame_simple only
+    looks at frame shape, which is fixed per video, so frame 0 decides the
+    role; only wide cameras go on to the full MOG2 decode.
+    Returns (role, confidence, segments) - segments is None if not wide.
+    """
+    cap = cv2.VideoCapture(str(video_path))
+    ret, frame = cap.read() if cap.isOpened() else (False, None)
+    cap.release()
+    if not ret or frame is None:
+        return "unknown", 0.0, None
+
+    role = classify_frame_simple(frame)
+    if role != "wide":
+        return role, 1.0, None
+
+    return role, 1.0, detect_rallies_mog2(video_path, **motion_kwargs)
 
 
 # ==========================================
@@ -180,9 +294,7 @@ class GlobalTimeline:
         timestamps = []
 
         for i, clip in enumerate(inputs):
-            dt = dateutil.parser.parse(clip["startTime"])
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
+            dt = parse_iso_cached(clip["startTime"])
             timestamps.append(dt)
 
             self.clips.append({
@@ -203,6 +315,17 @@ def local_sec_to_global_iso(clip_start_dt, seconds):
 # 4. GEMINI: LABEL SEGMENTS (NOT DETECT FROM SCRATCH)
 # ==========================================
 
+class SegmentLabel(BaseModel):
+    segment_index: int
+    is_rally: bool
+    confidence: float
+    reason: str
+
+
+class SegmentLabels(BaseModel):
+    labels: List[SegmentLabel]
+
+
 def gemini_label_segments(client, wide_video_uri, segments_payload, model=DEFAULT_MODEL):
     """
     segments_payload: list of dicts, each with:
@@ -244,7 +367,7 @@ Return JSON ONLY, in this format:
 }}
 
 Here are the segments:
-{json.dumps(segments_payload, indent=2)}
+{orjson.dumps(segments_payload, option=orjson.OPT_INDENT_2).decode()}
 """.strip()
 
     contents = [
@@ -257,18 +380,55 @@ Here are the segments:
         contents=contents,
         config=types.GenerateContentConfig(
             response_mime_type="application/json",
+            response_schema=SegmentLabels,  # constrained decoding, always well-formed
             temperature=0.0,
         ),
     )
-    return json.loads(resp.text)
+    if resp.parsed is not None:
+        return resp.parsed.model_dump()
+    return orjson.loads(resp.text)
+
+
+def gemini_label_segments_chunked(client, wide_video_uri, segments_payload, model=DEFAULT_MODEL):
+    """
+    Labels segments in LABEL_CHUNK_SIZE groups, LABEL_MAX_WORKERS requests at a
+    time. Each chunk is renumbered from 0 for the model; returned
+    segment_index values are shifted back by the chunk offset.
+    """
+    chunks = []
+    for offset in range(0, len(segments_payload), LABEL_CHUNK_SIZE):
+        chunk = [
+            {**seg, "segment_index": i}
+            for i, seg in enumerate(segments_payload[offset:offset + LABEL_CHUNK_SIZE])
+        ]
+        chunks.append((offset, chunk))
+
+    def label(item):
+        offset, chunk = item
+        labels = gemini_label_segments(client, wide_video_uri, chunk, model=model)
+        out = []
+        for lab in labels.get("labels", []):
+            si = lab.get("segment_index")
+            if not isinstance(si, int) or si < 0 or si >= len(chunk):
+                continue
+            out.append({**lab, "segment_index": si + offset})
+        return out
+
+    if not chunks:
+        return {"labels": []}
+
+    with ThreadPoolExecutor(max_workers=min(LABEL_MAX_WORKERS, len(chunks))) as ex:
+        results = list(ex.map(label, chunks))
+
+    return {"labels": [lab for chunk_labels in results for lab in chunk_labels]}
 
 
 # ==========================================
 # 5. CORE JOB
 # ==========================================
 
-def run_analysis_job(payload_json_str, workdir_str="/workspace"):
-    payload = json.loads(payload_json_str)
+def run_analysis_job(payload_json_str, workdir_str="/workspace", debug_local=False):
+    payload = orjson.loads(payload_json_str)
 
     bucket_name = payload["bucket"]
     inputs = payload["inputs"]
@@ -277,26 +437,16 @@ def run_analysis_job(payload_json_str, workdir_str="/workspace"):
     workdir = Path(workdir_str).resolve()
     workdir.mkdir(parents=True, exist_ok=True)
 
-    storage_client = storage.Client()
 
     print(f"🧠 Starting AI Analysis v2 for Production: {production_id}")
 
     # --------------------------------------
     # Download clips locally (for PASS1 + motion)
     # --------------------------------------
-    local_paths = []
-    for i, clip in enumerate(inputs):
-        local_path = workdir / f"clip_{i}.mp4"
-        blob = storage_client.bucket(bucket_name).blob(clip["path"])
-
-        if local_path.exists() and local_path.stat().st_size > 1024 * 1024:  # >1MB sanity check
-            print(f"♻️ Reusing cached file: {local_path}")
-        else:
-            print(f"⬇️ Downloading gs://{bucket_name}/{clip['path']} -> {local_path}")
-            local_path.parent.mkdir(parents=True, exist_ok=True)
-            blob.download_to_filename(str(local_path))
-
-        local_paths.append(local_path)
+    local_paths = download_clips(
+        bucket_name, inputs, workdir,
+        min_cached_bytes=1024 * 1024,  # >1MB sanity check
+    )
 
 
     # --------------------------------------
@@ -305,17 +455,32 @@ def run_analysis_job(payload_json_str, workdir_str="/workspace"):
     timeline = GlobalTimeline(inputs, bucket_name, local_paths)
 
     # --------------------------------------
-    # PASS 1: Camera Role Classification
+    # PASS 1 + MOTION: role + candidate segments, one decode per clip
     # --------------------------------------
-    print("📸 PASS 1: Classifying camera roles...")
+    print("📸 PASS 1: Classifying camera roles + detecting motion on wide cameras...")
+    motion_kwargs = dict(
+        motion_threshold=4.5,      # your known-good values
+        min_rally_duration=1.5,
+        merge_gap=2.0,
+    )
+
+    # One process per clip: decode + MOG2 are CPU-bound and hold the GIL.
+    # spawn, not fork: a forked copy of OpenCV's thread pool can deadlock.
+    clip_paths = [clip["local_path"] for clip in timeline.clips]
+    max_workers = min(len(clip_paths), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp.get_context("spawn")) as ex:
+        clip_results = list(ex.map(partial(analyze_clip, **motion_kwargs), clip_paths))
+
     camera_roles = {}
-    for i, clip in enumerate(timeline.clips):
-        role, conf = classify_camera_role(clip["local_path"])
+    segments_by_cam = {}
+    for i, (clip, (role, conf, segments)) in enumerate(zip(timeline.clips, clip_results)):
         camera_roles[str(i)] = {
             "role": role,
             "confidence": round(conf, 2),
             "uri": clip["gs_uri"],
         }
+        if segments is not None:
+            segments_by_cam[i] = segments
         print(f"   Cam {i}: {role} (conf={conf:.2f})")
 
     wide_cams = [int(i) for i, r in camera_roles.items() if r["role"] == "wide"]
@@ -323,32 +488,29 @@ def run_analysis_job(payload_json_str, workdir_str="/workspace"):
         # fallback: pick highest confidence unknown-> treat as wide (or cam0)
         print("⚠️ No wide cameras detected. Falling back to cam0.")
         wide_cams = [0]
+        segments_by_cam[0] = detect_rallies_mog2(timeline.clips[0]["local_path"], **motion_kwargs)
 
-    # --------------------------------------
-    # MOTION: candidate segments per wide camera
-    # --------------------------------------
-    print("🏃 Detecting motion segments on wide cameras...")
-    all_candidates = []  # flattened across wide cams
+    # Grouped per wide cam as they're built (PASS 2 labels each cam's list
+    # as-is); all_candidates is the flattened view for output.
+    candidates_by_cam = {}
     for cam_idx in wide_cams:
         clip = timeline.clips[cam_idx]
-        
-        segments = detect_rallies_mog2(
-            clip["local_path"],
-            motion_threshold=4.5,      # your known-good values
-            min_rally_duration=1.5,
-            merge_gap=2.0,
-        )
+        segments = segments_by_cam[cam_idx]
 
         print(f"   Cam {cam_idx}: {len(segments)} motion segments")
 
-        for (s, e) in segments:
-            all_candidates.append({
+        candidates_by_cam[cam_idx] = [
+            {
                 "wide_camera_index": cam_idx,
                 "start_local_sec": s,
                 "end_local_sec": e,
                 "start_global": local_sec_to_global_iso(clip["start_dt"], s),
                 "end_global": local_sec_to_global_iso(clip["start_dt"], e),
-            })
+            }
+            for (s, e) in segments
+        ]
+
+    all_candidates = [c for cam_idx in wide_cams for c in candidates_by_cam[cam_idx]]
 
     print("🧪 Motion candidates:")
     for seg in all_candidates:
@@ -369,51 +531,57 @@ def run_analysis_job(payload_json_str, workdir_str="/workspace"):
             "ai_data": ai_data,
             "motion_candidates": [],
         }
-        return _save_and_upload(storage_client, bucket_name, production_id, workdir, final_result)
+        return _save_and_upload(bucket_name, production_id, final_result,
+                            debug_dir=workdir if debug_local else None)
 
     # --------------------------------------
     # PASS 2: Gemini segment labeling
     # --------------------------------------
     print("🤖 PASS 2: Calling Gemini to label segments...")
-    client = genai.Client(vertexai=True, location="us-central1")
-
-    # Group by wide camera and label each wide cam separately (keeps context cleaner)
-    labeled_rallies = []
+    client = _get_genai_client()
+
+    # Label each wide cam separately (keeps context cleaner).
+    # Cameras are independent, so their Gemini calls run concurrently.
+    futures = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(wide_cams))) as ex:
+        for cam_idx in wide_cams:
+            # Add segment_index per camera batch
+            segments_payload = [
+                {"segment_index": si, **c}
+                for si, c in enumerate(candidates_by_cam[cam_idx])
+            ]
+            futures[cam_idx] = ex.submit(
+                gemini_label_segments_chunked,
+                client=client,
+                wide_video_uri=timeline.clips[cam_idx]["gs_uri"],
+                segments_payload=segments_payload,
+            )
+
+    labeled = []  # (seconds from global_zero, rally)
     for cam_idx in wide_cams:
-        clip = timeline.clips[cam_idx]
-        cam_candidates = [c for c in all_candidates if c["wide_camera_index"] == cam_idx]
-
-        # Add segment_index per camera batch
-        segments_payload = []
-        for si, c in enumerate(cam_candidates):
-            segments_payload.append({
-                "segment_index": si,
-                **c
-            })
-
-        labels = gemini_label_segments(
-            client=client,
-            wide_video_uri=clip["gs_uri"],
-            segments_payload=segments_payload,
-        )
+        labels = futures[cam_idx].result()
+        candidates = candidates_by_cam[cam_idx]
+        cam_offset = (timeline.clips[cam_idx]["start_dt"] - timeline.global_zero).total_seconds()
 
         # Merge labels -> rallies
         for item in labels.get("labels", []):
             si = item.get("segment_index")
-            if si is None or si < 0 or si >= len(cam_candidates):
+            if si is None or si < 0 or si >= len(candidates):
                 continue
             if item.get("is_rally") is True:
-                seg = cam_candidates[si]
-                labeled_rallies.append({
+                seg = candidates[si]
+                labeled.append((cam_offset + seg["start_local_sec"], {
                     "start_global": seg["start_global"],
                     "end_global": seg["end_global"],
                     "wide_camera_index": cam_idx,
                     "confidence": float(item.get("confidence", 0.0)),
                     "reason": item.get("reason", ""),
-                })
+                }))
 
-    # Sort rallies by start time for downstream EDL
-    labeled_rallies.sort(key=lambda r: r["start_global"])
+    # Sort rallies by start time for downstream EDL. Numeric, not by the ISO
+    # strings: isoformat() drops the fraction when it is zero.
+    labeled.sort(key=lambda kr: kr[0])
+    labeled_rallies = [r for _, r in labeled]
 
     ai_data = {"rallies": labeled_rallies}
 
@@ -425,19 +593,58 @@ def run_analysis_job(payload_json_str, workdir_str="/workspace"):
         "ai_data": ai_data,
     }
 
-    return _save_and_upload(storage_client, bucket_name, production_id, workdir, final_result)
+    return _save_and_upload(bucket_name, production_id, final_result,
+                            debug_dir=workdir if debug_local else None)
+
+
+# Result uploads run in the background so local cleanup overlaps the GCS
+# write; main() drains them before exiting so failures still surface.
+_UPLOAD_POOL = ThreadPoolExecutor(max_workers=4)
+_PENDING_UPLOADS = []
+atexit.register(_UPLOAD_POOL.shutdown, wait=True)
+
+
+def _upload_with_retry(blob, data, attempts=3):
+    for attempt in range(attempts):
+        try:
+            blob.upload_from_string(data, content_type="application/json")
+            print(f"✅ Uploaded gs://{blob.bucket.name}/{blob.name}")
+            return
+        except Exception as e:
+            if attempt == attempts - 1:
+                raise
+            delay = 2 ** attempt
+            print(f"⚠️ Upload failed ({e}), retrying in {delay}s...")
+            time.sleep(delay)
+
+
+def _upload_async(blob, data):
+    future = _UPLOAD_POOL.submit(_upload_with_retry, blob, data)
+    _PENDING_UPLOADS.append(future)
+    return future
+
+
+def _wait_for_uploads():
+    while _PENDING_UPLOADS:
+        _PENDING_UPLOADS.pop(0).result()
+
 
+def _save_and_upload(bucket_name, production_id, final_result, debug_dir=None):
+    # Serialized straight to the upload; no local file round-trip
+    data = orjson.dumps(final_result, option=orjson.OPT_SERIALIZE_NUMPY)
 
-def _save_and_upload(storage_client, bucket_name, production_id, workdir, final_result):
-    out_path = workdir / f"analysis_{production_id}.json"
-    with open(out_path, "w") as f:
-        json.dump(final_result, f, indent=2)
+    if debug_dir is not None:
+        local_out = Path(debug_dir) / f"analysis_{production_id}.json"
+        local_out.write_bytes(orjson.dumps(
+            final_result,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY,
+        ))
+        print(f"💾 Debug copy written to {local_out}")
 
     gcs_out = f"productions/{production_id}/analysis.json"
-    print(f"⬆️ Uploading {out_path} -> gs://{bucket_name}/{gcs_out}")
-    storage_client.bucket(bucket_name).blob(gcs_out).upload_from_filename(str(out_path))
+    print(f"⬆️ Uploading analysis -> gs://{bucket_name}/{gcs_out}")
+    _upload_async(get_bucket(bucket_name).blob(gcs_out), data)
 
-    print(f"✅ Analysis complete: gs://{bucket_name}/{gcs_out}")
     return final_result
 
 
@@ -449,10 +656,13 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--payload", required=True)
     parser.add_argument("--workdir", default="./workspace")
+    parser.add_argument("--debug-local", action="store_true",
+                        help="Also write a pretty-printed analysis.json into --workdir")
     args = parser.parse_args()
 
     try:
-        run_analysis_job(args.payload, args.workdir)
+        run_analysis_job(args.payload, args.workdir, debug_local=args.debug_local)
+        _wait_for_uploads()
         return 0
     except Exception as e:
         print(f"❌ Critical Failure: {e}", file=sys.stderr)
@@ -1,18 +1,24 @@
 #!/usr/bin/env python3
 import argparse
 import sys
-import json
+import threading
+import urllib.request
+import orjson
+from bisect import bisect_right
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
-from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 
-import cv2
+import av
+import decord
 import numpy as np
-import dateutil.parser
 import mediapipe as mp
+from mediapipe.tasks import python as mp_tasks
+from mediapipe.tasks.python import vision as mp_vision
 
 from ultralytics import YOLO
-from google.cloud import storage
+
+from analysisCommon import download_clips, parse_iso_cached
 
 
 # ==========================================
@@ -21,7 +27,14 @@ from google.cloud import storage
 
 SAMPLE_TIMES = [1, 5, 10, 30]  # seconds
 YOLO_MODEL_PATH = "yolov8n.pt"
+POSE_MODEL_PATH = Path(__file__).resolve().parent / "models" / "pose_landmarker_lite.task"
+POSE_MODEL_URL = (
+    "https://storage.googleapis.com/mediapipe-models/pose_landmarker/"
+    "pose_landmarker_lite/float16/latest/pose_landmarker_lite.task"
+)
+POSE_MAX_SIDE = 640  # MediaPipe runs at ~256px internally; landmarks are normalized
 LOCAL_OUT = "analysis_local.json"
+SPECULATIVE_WIDE_CAM = 0  # swing pass starts here while YOLO picks the real wide cam
 
 
 # ==========================================
@@ -29,15 +42,35 @@ LOCAL_OUT = "analysis_local.json"
 # ==========================================
 
 def sample_frames(video_path, times):
-    cap = cv2.VideoCapture(str(video_path))
-    frames = []
-    for t in times:
-        cap.set(cv2.CAP_PROP_POS_MSEC, t * 1000)
-        ret, frame = cap.read()
-        if ret and frame is not None:
-            frames.append(frame)
-    cap.release()
-    return frames
+    try:
+        vr = decord.VideoReader(str(video_path), num_threads=4)
+    except decord.DECORDError:
+        return []
+    fps = vr.get_avg_fps() or 30.0
+    idxs = [int(t * fps) for t in times if int(t * fps) < len(vr)]
+    if not idxs:
+        return []
+
+    # Decode whichever way touches fewer frames: keyframe seeks (each one
+    # decodes forward from the preceding keyframe) or a single forward scan
+    # to the last target. Long-GOP footage + early SAMPLE_TIMES favour the scan.
+    keys = vr.get_key_indices()
+    seek_cost = sum(i - keys[max(0, bisect_right(keys, i) - 1)] + 1 for i in idxs)
+    scan_cost = max(idxs) + 1
+
+    if seek_cost <= scan_cost:
+        batch = vr.get_batch(idxs).asnumpy()
+    else:
+        by_idx = {}
+        pos = 0
+        for i in sorted(set(idxs)):
+            vr.skip_frames(i - pos)  # decode only, no RGB conversion / copy out
+            by_idx[i] = vr.next().asnumpy()
+            pos = i + 1
+        batch = [by_idx[i] for i in idxs]
+
+    # decord is RGB; YOLO expects OpenCV-style BGR
+    return [np.ascontiguousarray(f[..., ::-1]) for f in batch]
 
 
 # ==========================================
@@ -46,38 +79,69 @@ def sample_frames(video_path, times):
 
 yolo_model = YOLO(YOLO_MODEL_PATH)
 
+def _person_stats(results):
+    """
+    (person_count, max_person_area_ratio or None) for one YOLO result.
+    Box math stays on the result's device; one scalar comes back per frame.
+    """
+    boxes = results.boxes
+    person_xyxy = boxes.xyxy[boxes.cls == 0]  # person
+    if len(person_xyxy) == 0:
+        return 0, None
+
+    h, w = results.orig_shape
+    wh = person_xyxy[:, 2:] - person_xyxy[:, :2]
+    areas = (wh[:, 0] * wh[:, 1]).clamp(min=1.0)
+    return int(person_xyxy.shape[0]), (areas.max() / (h * w)).item()
+
+
+# (video_path, sample_times) -> [(person_count, max_ratio), ...] per sampled
+# frame, shared by pick_best_wide_camera and classify_camera_role_by_people
+_yolo_cache = {}
+
+
+def _yolo_person_stats_many(video_paths, sample_times):
+    keys = [(str(p), tuple(sample_times)) for p in video_paths]
+    missing = [k for k in dict.fromkeys(keys) if k not in _yolo_cache]
+
+    if missing:
+        # Sample the uncached videos concurrently (decord decodes off the GIL),
+        # then run ONE batched YOLO forward pass over all their frames.
+        with ThreadPoolExecutor(max_workers=len(missing)) as ex:
+            frames_per_video = list(ex.map(lambda k: sample_frames(k[0], k[1]), missing))
+
+        all_frames = [f for frames in frames_per_video for f in frames]
+        all_results = yolo_model(all_frames, verbose=False, imgsz=640) if all_frames else []
+
+        offset = 0
+        for key, frames in zip(missing, frames_per_video):
+            _yolo_cache[key] = [_person_stats(r) for r in all_results[offset:offset + len(frames)]]
+            offset += len(frames)
+
+    return [_yolo_cache[k] for k in keys]
+
+
+def _yolo_person_stats(video_path, sample_times):
+    return _yolo_person_stats_many([video_path], sample_times)[0]
+
+
 def pick_best_wide_camera(local_paths, sample_times):
     scores = []
 
-    for cam_idx, video_path in enumerate(local_paths):
-        frames = sample_frames(video_path, sample_times)
-        if not frames:
+    stats_per_cam = _yolo_person_stats_many(local_paths, sample_times)
+
+    for cam_idx, stats in enumerate(stats_per_cam):
+        if not stats:
             scores.append((cam_idx, -1e9, {"avg_ratio": None, "avg_people": None}))
             continue
 
         ratios = []
         person_counts = []
 
-        for f in frames:
-            h, w, _ = f.shape
-            frame_area = h * w
-
-            results = yolo_model(f, verbose=False)[0]
-            person_boxes = [b for b in results.boxes if int(b.cls[0]) == 0]  # person
-
-            person_counts.append(len(person_boxes))
-
-            if not person_boxes:
-                continue
-
-            max_ratio = 0.0
-            for b in person_boxes:
-                x1, y1, x2, y2 = b.xyxy[0].cpu().numpy()
-                area = max(1.0, (x2 - x1) * (y2 - y1))
-                ratio = area / frame_area
-                max_ratio = max(max_ratio, ratio)
-
-            ratios.append(max_ratio)
+        for count, max_ratio in stats:
+            person_counts.append(count)
+            if max_ratio is not None:
+                ratios.append(max_ratio)
 
         avg_ratio = float(np.mean(ratios)) if ratios else 1.0
         avg_people = float(np.mean(person_counts)) if person_counts else 0.0
@@ -102,33 +166,17 @@ def pick_best_wide_camera(local_paths, sample_times):
 
 
 def classify_camera_role_by_people(video_path):
-    frames = sample_frames(video_path, SAMPLE_TIMES)
-    if not frames:
+    stats = _yolo_person_stats(video_path, SAMPLE_TIMES)
+    if not stats:
         return "unknown", 0.0
 
     ratios = []
     person_counts = []
 
-    for f in frames:
-        h, w, _ = f.shape
-        frame_area = h * w
-
-        results = yolo_model(f, verbose=False)[0]
-        person_boxes = [b for b in results.boxes if int(b.cls[0]) == 0]  # person
-
-        person_counts.append(len(person_boxes))
-
-        if not person_boxes:
-            continue
-
-        max_ratio = 0.0
-        for b in person_boxes:
-            x1, y1, x2, y2 = b.xyxy[0].cpu().numpy()
-            area = max(1.0, (x2 - x1) * (y2 - y1))
-            ratio = area / frame_area
-            max_ratio = max(max_ratio, ratio)
-
-        ratios.append(max_ratio)
+    for count, max_ratio in stats:
+        person_counts.append(count)
+        if max_ratio is not None:
+            ratios.append(max_ratio)
 
     if not ratios:
         return "unknown", 0.0
@@ -150,61 +198,166 @@ def classify_camera_role_by_people(video_path):
 # 3. SWING DETECTION (MEDIAPIPE)
 # ==========================================
 
-def detect_swings_mediapipe(video_path, player="near", min_peak_gap_sec=0.6):
-    mp_pose = mp.solutions.pose
-    pose = mp_pose.Pose(
-        static_image_mode=False,
-        model_complexity=1,
-        smooth_landmarks=True,
-        enable_segmentation=False,
-        min_detection_confidence=0.5,
-        min_tracking_confidence=0.5,
-    )
-
-    cap = cv2.VideoCapture(str(video_path))
-    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-
-    wrist_history = deque(maxlen=5)
-    swing_times = []
-    prev_peak_t = -999
-
-    frame_idx = 0
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        res = pose.process(rgb)
-
-        t = frame_idx / fps
-
-        if res.pose_landmarks:
-            lm = res.pose_landmarks.landmark
-
-            if player == "near":
-                wrist = lm[mp_pose.PoseLandmark.RIGHT_WRIST]
-            else:
-                wrist = lm[mp_pose.PoseLandmark.LEFT_WRIST]
+def _ensure_pose_model():
+    # The .task bundle isn't checked in; fetch it once next to this script.
+    if not POSE_MODEL_PATH.exists():
+        print(f"⬇️ Fetching MediaPipe pose model -> {POSE_MODEL_PATH}")
+        POSE_MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp = POSE_MODEL_PATH.with_suffix(".part")
+        urllib.request.urlretrieve(POSE_MODEL_URL, tmp)
+        tmp.replace(POSE_MODEL_PATH)
+    return str(POSE_MODEL_PATH)
+
+
+def _open_pose_landmarker():
+    model_path = _ensure_pose_model()
+    # Lite model, two poses (near + far player) per frame. GPU delegate
+    # where the build supports it, else the same model on CPU.
+    for delegate in (mp_tasks.BaseOptions.Delegate.GPU, mp_tasks.BaseOptions.Delegate.CPU):
+        try:
+            return mp_vision.PoseLandmarker.create_from_options(
+                mp_vision.PoseLandmarkerOptions(
+                    base_options=mp_tasks.BaseOptions(
+                        model_asset_path=model_path,
+                        delegate=delegate,
+                    ),
+                    running_mode=mp_vision.RunningMode.VIDEO,
+                    num_poses=2,
+                    min_pose_detection_confidence=0.5,
+                    min_tracking_confidence=0.5,
+                )
+            )
+        except (RuntimeError, NotImplementedError) as e:
+            if delegate == mp_tasks.BaseOptions.Delegate.CPU:
+                raise
+            print(f"⚠️ MediaPipe GPU delegate unavailable, using CPU: {e}")
+
+
+def _assign_poses(poses, last_wrist, wrist_landmark):
+    """
+    Match detected poses to near/far by distance from each player's last
+    wrist position, so identities don't swap when the players cross in
+    depth. With a single pose only the closer player gets a sample.
+    """
+    def cost(player, pose):
+        w = pose[wrist_landmark[player]]
+        px, py = last_wrist[player]
+        return (w.x - px) ** 2 + (w.y - py) ** 2
+
+    if len(poses) >= 2:
+        a, b = poses[0], poses[1]
+        if cost("near", a) + cost("far", b) <= cost("near", b) + cost("far", a):
+            return {"near": a, "far": b}
+        return {"near": b, "far": a}
+
+    pose = poses[0]
+    player = min(("near", "far"), key=lambda p: cost(p, pose))
+    return {player: pose}
+
+
+def detect_swings_mediapipe(video_path, players=("near", "far"), min_peak_gap_sec=0.6, stop_event=None):
+    """
+    One decode + one pose inference per frame for all players; each player
+    probes its own wrist with its own history / peak detector.
+    Returns {player: [swing_time_sec, ...]}.
+    """
+    landmarker = _open_pose_landmarker()
+
+    wrist_landmark = {
+        "near": mp.solutions.pose.PoseLandmark.RIGHT_WRIST,
+        "far": mp.solutions.pose.PoseLandmark.LEFT_WRIST,
+    }
 
-            wrist_xy = np.array([wrist.x, wrist.y])
-            wrist_history.append(wrist_xy)
+    # PyAV streams packet by packet with threaded decode, and converts
+    # straight to RGB, which is what MediaPipe wants (no cvtColor per frame)
+    container = av.open(str(video_path))
+    stream = container.streams.video[0]
+    stream.thread_type = "AUTO"
+    fps = float(stream.average_rate or 30.0)
+    first_pts = None
+    last_ts_ms = -1
+
+    # Downscale inside the same swscale pass that does the RGB conversion
+    src_w, src_h = stream.codec_context.width, stream.codec_context.height
+    scale = min(1.0, POSE_MAX_SIDE / max(src_w, src_h, 1))
+    pose_w, pose_h = int(src_w * scale) & ~1, int(src_h * scale) & ~1
+
+    # Per-player wrist tracks for frames where that player was found, filled
+    # during decode; swing math runs once over each track after the loop.
+    # Preallocated from the container's frame count, grown if it undercounts.
+    capacity = max(1, stream.frames or 1024)
+    times = {p: np.empty(capacity, dtype=np.float64) for p in players}
+    wrist_xy = {p: np.empty((capacity, 2), dtype=np.float64) for p in players}
+    count = {p: 0 for p in players}
+    last_wrist = None  # {"near": (x, y), "far": (x, y)} once both are seen
+
+    for frame in container.decode(stream):
+        if stop_event is not None and stop_event.is_set():
+            break  # speculative run discarded (see run_analysis_job)
+
+        if scale < 1.0:
+            rgb = frame.reformat(pose_w, pose_h, format="rgb24", interpolation="AREA").to_ndarray()
+        else:
+            rgb = frame.to_ndarray(format="rgb24")
+
+        # Seconds from the first frame, from the frame's own timestamp
+        if first_pts is None:
+            first_pts = frame.pts
+        t = float((frame.pts - first_pts) * stream.time_base)
+
+        # VIDEO mode needs strictly increasing millisecond timestamps
+        ts_ms = max(int(t * 1000), last_ts_ms + 1)
+        last_ts_ms = ts_ms
+        res = landmarker.detect_for_video(
+            mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb), ts_ms
+        )
 
-            if len(wrist_history) >= 3:
-                v1 = np.linalg.norm(wrist_history[-1] - wrist_history[-2]) * fps
-                v0 = np.linalg.norm(wrist_history[-2] - wrist_history[-3]) * fps
-                a = abs(v1 - v0)
+        if not res.pose_landmarks:
+            continue
 
-                if v1 > 1.2 and a > 0.6:
-                    if (t - prev_peak_t) > min_peak_gap_sec:
-                        swing_times.append(round(t, 2))
-                        prev_peak_t = t
+        if last_wrist is None:
+            # Seed identities on the first frame with both players: lower in
+            # frame = nearer the camera
+            if len(res.pose_landmarks) < 2:
+                continue
+            poses = sorted(res.pose_landmarks[:2], key=lambda lm: -lm[0].y)
+            pose_for = {"near": poses[0], "far": poses[1]}
+            last_wrist = {}
+        else:
+            pose_for = _assign_poses(res.pose_landmarks, last_wrist, wrist_landmark)
 
-        frame_idx += 1
+        for player, pose in pose_for.items():
+            wrist = pose[wrist_landmark[player]]
+            last_wrist[player] = (wrist.x, wrist.y)
+            if player not in count:
+                continue
+            i = count[player]
+            if i == len(times[player]):
+                times[player] = np.resize(times[player], 2 * i)
+                wrist_xy[player] = np.resize(wrist_xy[player], (2 * i, 2))
+            times[player][i] = t
+            wrist_xy[player][i] = (wrist.x, wrist.y)
+            count[player] = i + 1
+
+    container.close()
+    landmarker.close()
+
+    swing_times = {}
+    for player in players:
+        n = count[player]
+        # Speed between consecutive detections; a swing is a sample where
+        # speed > 1.2 and its change from the previous step > 0.6
+        v = np.linalg.norm(np.diff(wrist_xy[player][:n], axis=0), axis=1) * fps
+        hits = np.flatnonzero((v[1:] > 1.2) & (np.abs(np.diff(v)) > 0.6)) + 2
+
+        # Enforce the minimum gap against the last accepted swing
+        swing_times[player] = []
+        prev_peak_t = -999
+        for t in times[player][hits].tolist():
+            if (t - prev_peak_t) > min_peak_gap_sec:
+                swing_times[player].append(round(t, 2))
+                prev_peak_t = t
 
-    cap.release()
-    pose.close()
     return swing_times
 
 
@@ -218,9 +371,7 @@ class GlobalTimeline:
         timestamps = []
 
         for i, clip in enumerate(inputs):
-            dt = dateutil.parser.parse(clip["startTime"])
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
+            dt = parse_iso_cached(clip["startTime"])
             timestamps.append(dt)
 
             self.clips.append({
@@ -241,7 +392,7 @@ def local_sec_to_global_iso(clip_start_dt, seconds):
 # ==========================================
 
 def run_analysis_job(payload_json_str, workdir_str="./workspace"):
-    payload = json.loads(payload_json_str)
+    payload = orjson.loads(payload_json_str)
     bucket_name = payload["bucket"]
     inputs = payload["inputs"]
     production_id = payload["productionId"]
@@ -249,25 +400,16 @@ def run_analysis_job(payload_json_str, workdir_str="./workspace"):
     workdir = Path(workdir_str).resolve()
     workdir.mkdir(parents=True, exist_ok=True)
 
-    storage_client = storage.Client()
 
     print(f"\n🧠 Starting Local CV Analysis for Production: {production_id}")
 
     # --------------------------------------
     # Download clips locally (cached)
     # --------------------------------------
-    local_paths = []
-    for i, clip in enumerate(inputs):
-        local_path = workdir / f"clip_{i}.mp4"
-        blob = storage_client.bucket(bucket_name).blob(clip["path"])
-
-        if local_path.exists() and local_path.stat().st_size > 1_000_000:
-            print(f"♻️ Reusing cached file: {local_path}")
-        else:
-            print(f"⬇️ Downloading gs://{bucket_name}/{clip['path']} -> {local_path}")
-            blob.download_to_filename(str(local_path))
-
-        local_paths.append(local_path)
+    local_paths = download_clips(
+        bucket_name, inputs, workdir,
+        min_cached_bytes=1_000_000,
+    )
 
     # --------------------------------------
     # Timeline
@@ -276,43 +418,49 @@ def run_analysis_job(payload_json_str, workdir_str="./workspace"):
 
     # --------------------------------------
     # PASS 1: Pick WIDE camera
+    # PASS 2 (speculative): swings on Cam 0 while YOLO ranks the cameras
     # --------------------------------------
     print("📸 Detecting WIDE camera using YOLO person scale (ranking)...")
+    print(f"🏓 Speculatively detecting swings on Cam {SPECULATIVE_WIDE_CAM} with MediaPipe Pose...")
 
-    wide_cam, best_score, debug = pick_best_wide_camera(local_paths, SAMPLE_TIMES)
+    stop_speculative = threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        speculative = ex.submit(
+            detect_swings_mediapipe, local_paths[SPECULATIVE_WIDE_CAM], stop_event=stop_speculative
+        )
 
-    print(
-        f"🎾 Selected WIDE camera: Cam {wide_cam} "
-        f"(score={best_score:.3f}, "
-        f"avg_people={debug['avg_people']:.2f}, "
-        f"avg_ratio={debug['avg_ratio']:.4f})"
-    )
+        wide_cam, best_score, debug = pick_best_wide_camera(local_paths, SAMPLE_TIMES)
 
-    print(f"\n🎾 Using WIDE camera: Cam {wide_cam}")
+        print(
+            f"🎾 Selected WIDE camera: Cam {wide_cam} "
+            f"(score={best_score:.3f}, "
+            f"avg_people={debug['avg_people']:.2f}, "
+            f"avg_ratio={debug['avg_ratio']:.4f})"
+        )
 
-    clip = timeline.clips[wide_cam]
+        print(f"\n🎾 Using WIDE camera: Cam {wide_cam}")
 
-    # --------------------------------------
-    # PASS 2: Swing detection
-    # --------------------------------------
-    print("\n🏓 Detecting swings with MediaPipe Pose...")
-    near_swings = detect_swings_mediapipe(clip["local_path"], player="near")
-    far_swings  = detect_swings_mediapipe(clip["local_path"], player="far")
+        clip = timeline.clips[wide_cam]
+
+        # --------------------------------------
+        # PASS 2: Swing detection
+        # --------------------------------------
+        if wide_cam == SPECULATIVE_WIDE_CAM:
+            print("\n🏓 Speculative swing pass was on the WIDE camera; using it.")
+            swings = speculative.result()
+        else:
+            print(f"\n🏓 Discarding speculative Cam {SPECULATIVE_WIDE_CAM} pass; detecting swings with MediaPipe Pose...")
+            stop_speculative.set()
+            swings = detect_swings_mediapipe(clip["local_path"])
 
     all_swings = []
-    for t in near_swings:
-        all_swings.append({
-            "time_sec": t,
-            "player": "near",
-            "time_global": local_sec_to_global_iso(clip["start_dt"], t),
-        })
-
-    for t in far_swings:
-        all_swings.append({
-            "time_sec": t,
-            "player": "far",
-            "time_global": local_sec_to_global_iso(clip["start_dt"], t),
-        })
+    for player in ("near", "far"):
+        for t in swings[player]:
+            all_swings.append({
+                "time_sec": t,
+                "player": player,
+                "time_global": local_sec_to_global_iso(clip["start_dt"], t),
+            })
 
     all_swings.sort(key=lambda s: s["time_sec"])
 
@@ -331,8 +479,8 @@ def run_analysis_job(payload_json_str, workdir_str="./workspace"):
     }
 
     out_path = workdir / LOCAL_OUT
-    with open(out_path, "w") as f:
-        json.dump(out, f, indent=2)
+    with open(out_path, "wb") as f:
+        f.write(orjson.dumps(out, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
 
     print(f"\n💾 Wrote local results to: {out_path}")
     print("\n✅ Done.")
@@ -0,0 +1,106 @@
+# analysisCommon.py
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import dateutil.parser
+from google.cloud import storage
+from google.cloud.storage import transfer_manager
+from requests.adapters import HTTPAdapter
+
+GCS_POOL_SIZE = 32  # keep-alive connections shared by transfer threads
+
+# GCS download tuning
+DOWNLOAD_CHUNK_SIZE = 32 * 1024 * 1024
+DOWNLOAD_CHUNK_WORKERS = 8
+LARGE_CLIP_BYTES = 200 * 1024 * 1024  # chunked download at/above this size
+
+
+# One client per process: construction does auth discovery and opens a new
+# session, so jobs and helpers share these instead of building their own.
+@lru_cache(maxsize=1)
+def get_client():
+    client = storage.Client()
+    # requests keeps 10 pooled connections per host by default; with more
+    # transfer threads than that the extras are closed after each request
+    # and every later request pays a fresh TLS handshake.
+    adapter = HTTPAdapter(pool_connections=GCS_POOL_SIZE, pool_maxsize=GCS_POOL_SIZE)
+    client._http.mount("https://", adapter)
+    return client
+
+
+@lru_cache(maxsize=16)
+def get_bucket(name):
+    return get_client().bucket(name)
+
+
+def parse_iso(s):
+    # Workflow timestamps are ISO-8601; only fall back to dateutil for odd inputs.
+    try:
+        return datetime.fromisoformat(s.replace('Z', '+00:00'))
+    except ValueError:
+        return dateutil.parser.parse(s)
+
+
+@lru_cache(maxsize=4096)
+def parse_iso_cached(s):
+    # Synced rigs share startTime strings; datetimes are immutable so reuse is safe.
+    dt = parse_iso(s)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def download_clips(bucket_name, inputs, workdir, min_cached_bytes):
+    """
+    Downloads every input to workdir/clip_{i}.mp4, reusing cached files.
+    Clips download concurrently: small ones through one download_many pool,
+    large ones (>= LARGE_CLIP_BYTES) as parallel 32MB range-GET chunks.
+    """
+    bucket = get_bucket(bucket_name)
+    local_paths = []
+    pending = []
+    for i, clip in enumerate(inputs):
+        local_path = workdir / f"clip_{i}.mp4"
+        if local_path.exists() and local_path.stat().st_size > min_cached_bytes:
+            print(f"♻️ Reusing cached file: {local_path}")
+        else:
+            print(f"⬇️ Downloading gs://{bucket_name}/{clip['path']} -> {local_path}")
+            blob = bucket.get_blob(clip["path"])  # fetches size for the split below
+            if blob is None:
+                raise FileNotFoundError(f"gs://{bucket_name}/{clip['path']}")
+            local_path.parent.mkdir(parents=True, exist_ok=True)
+            pending.append((blob, str(local_path)))
+        local_paths.append(local_path)
+
+    small = [(blob, path) for blob, path in pending if blob.size < LARGE_CLIP_BYTES]
+    large = [(blob, path) for blob, path in pending if blob.size >= LARGE_CLIP_BYTES]
+
+    def fetch_small():
+        transfer_manager.download_many(
+            small,
+            max_workers=min(len(small), 8),
+            worker_type=transfer_manager.THREAD,
+            raise_exception=True,
+        )
+
+    def fetch_large(item):
+        blob, path = item
+        transfer_manager.download_chunks_concurrently(
+            blob,
+            path,
+            chunk_size=DOWNLOAD_CHUNK_SIZE,
+            max_workers=DOWNLOAD_CHUNK_WORKERS,
+            worker_type=transfer_manager.THREAD,
+        )
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=len(large) + 1) as ex:
+            futures = [ex.submit(fetch_large, item) for item in large]
+            if small:
+                futures.append(ex.submit(fetch_small))
+            for future in futures:
+                future.result()
+
+    return local_paths
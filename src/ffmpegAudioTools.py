@@ -4,17 +4,40 @@ Audio helpers: extract, mix, mux.
 Offset-aware and timeline-safe.
 """
 
+import os
 import subprocess
 from pathlib import Path
 
+from ffmpegCommon import FFMPEG_THREADING_FLAGS, FfmpegDAG, filter_complex_args
+
 
 def run(cmd: list):
     print("➡️", " ".join(cmd))
-    r = subprocess.run(cmd)
+    # argv list, no shell; DEVNULL keeps ffmpeg off the terminal's stdin
+    r = subprocess.run(cmd, stdin=subprocess.DEVNULL, close_fds=False)
     if r.returncode != 0:
         raise RuntimeError(f"Command failed: {cmd}")
 
 
+def audioCodec(path: Path) -> str | None:
+    """Codec name of the first audio stream, or None if probing fails."""
+    r = subprocess.run(
+        [
+            "ffprobe",
+            "-v", "error",
+            "-select_streams", "a:0",
+            "-show_entries", "stream=codec_name",
+            "-of", "default=noprint_wrappers=1:nokey=1",
+            str(path),
+        ],
+        capture_output=True,
+        text=True,
+    )
+    if r.returncode != 0:
+        return None
+    return r.stdout.strip() or None
+
+
 # --------------------------------------------------------------
 # TRIM MODE: Offset-aware audio extraction + timestamp reset
 # --------------------------------------------------------------
@@ -26,6 +49,7 @@ def extractAudioTrimmed(inVideo: Path, outAudio: Path, offset: float):
     cmd = [
         "ffmpeg",
         "-y",
+        *FFMPEG_THREADING_FLAGS,
         "-ss", f"{offset}",
         "-i", str(inVideo),
         "-vn",
@@ -49,6 +73,7 @@ def extractAudioUntrimmed(inVideo: Path, outAudio: Path):
     cmd = [
         "ffmpeg",
         "-y",
+        *FFMPEG_THREADING_FLAGS,
         "-i", str(inVideo),
         "-vn",
         "-af", "asetpts=PTS-STARTPTS",
@@ -59,30 +84,163 @@ def extractAudioUntrimmed(inVideo: Path, outAudio: Path):
     run(cmd)
 
 
+# --------------------------------------------------------------
+# BATCH: all cameras' extractions, split across concurrent ffmpegs
+# --------------------------------------------------------------
+def _extractAudioCmd(
+    jobs: list[tuple[Path, Path, float | None, float]],
+    pad_to: float | None = None,
+) -> list:
+    inputs = []
+    outputs = []
+    for i, (inVideo, outAudio, offset, delay) in enumerate(jobs):
+        if offset is not None:
+            inputs += ["-ss", f"{offset}"]
+        inputs += ["-i", str(inVideo)]
+
+        af = "asetpts=PTS-STARTPTS"
+        delay_ms = max(0, int(delay * 1000))
+        if delay_ms:
+            af += f",adelay={delay_ms}|{delay_ms}"
+        if pad_to is not None:
+            af += f",apad=whole_dur={pad_to}"
+
+        outputs += [
+            "-map", f"{i}:a:0",
+            "-af", af,
+            "-c:a", "aac",
+            "-b:a", "192k",
+            str(outAudio),
+        ]
+
+    return [
+        "ffmpeg",
+        "-y",
+        *FFMPEG_THREADING_FLAGS,
+        *inputs,
+        *outputs,
+    ]
+
+
+def extractAudioTracksCmds(
+    jobs: list[tuple[Path, Path, float | None, float]],
+    max_procs: int | None = None,
+    pad_to: float | None = None,
+) -> list[list]:
+    """
+    jobs: (inVideo, outAudio, offset, delay) per camera. offset=None extracts
+    the whole track (timeline mode), else trims like extractAudioTrimmed.
+    delay (seconds) places the track on the timeline at extraction time, so
+    the final mux can stream-copy it; pad_to pads every track with silence
+    to that many seconds so a -shortest mux doesn't cut the video.
+    Same per-output settings as the single-file helpers. Jobs are split
+    across up to max_procs independent ffmpeg commands (default: one per
+    core), since a single ffmpeg runs its AAC encoders one after another.
+    """
+    if not jobs:
+        return []
+
+    n_procs = max(1, min(len(jobs), max_procs or os.cpu_count() or 1))
+    return [_extractAudioCmd(jobs[g::n_procs], pad_to=pad_to) for g in range(n_procs)]
+
+
+def extractAudioTracksBatch(
+    jobs: list[tuple[Path, Path, float | None, float]],
+    max_procs: int | None = None,
+    pad_to: float | None = None,
+):
+    """Runs extractAudioTracksCmds concurrently."""
+    dag = FfmpegDAG()
+    for cmd in extractAudioTracksCmds(jobs, max_procs=max_procs, pad_to=pad_to):
+        dag.add(cmd, capture=True)
+    dag.run()
+
+
+# --------------------------------------------------------------
+# Layout scripts: mix of the synced [a0]..[aN-1] camera streams
+# --------------------------------------------------------------
+def mergeMixFilter(n: int, mode: str = "amix") -> tuple[str, str]:
+    """
+    Returns (per_input_suffix, mix_expr): the suffix goes on each [a{i}]
+    chain, mix_expr consumes [a0]..[a{n-1}] and yields [aout].
+    """
+    inputs = "".join(f"[a{i}]" for i in range(n))
+    if mode == "amerge":
+        # Inputs are already synced by -ss: a plain per-channel sum (same gain
+        # as amix normalize=0) without amix's per-input buffering. Stops at
+        # the shortest track. aformat pins every input to 2 channels so the
+        # pan indices hold for mono sources too.
+        left = "+".join(f"c{2 * i}" for i in range(n))
+        right = "+".join(f"c{2 * i + 1}" for i in range(n))
+        return (
+            ",aformat=channel_layouts=stereo",
+            f"{inputs}amerge=inputs={n},pan=stereo|c0={left}|c1={right}[aout]",
+        )
+    return "", f"{inputs}amix=inputs={n}:normalize=0:duration=longest[aout]"
+
+
 # --------------------------------------------------------------
 # TRIM MODE: Mix multiple already-trimmed audio streams
 # --------------------------------------------------------------
-def mixAudioTracksTrim(audioList, outAudio: Path):
+def mixAudioTracksTrim(
+    audioList,
+    outAudio: Path,
+    offsets: list[float] | None = None,
+    video_path: Path | None = None,
+):
+    run(mixAudioTracksTrimCmd(audioList, outAudio, offsets=offsets, video_path=video_path))
+
+
+def mixAudioTracksTrimCmd(
+    audioList,
+    outAudio: Path,
+    offsets: list[float] | None = None,
+    video_path: Path | None = None,
+) -> list:
+    """
+    With offsets, audioList is the camera files themselves: each is trimmed
+    on input (as extractAudioTrimmed does) and mixed in the same process.
+    With video_path the mix is muxed into outAudio with a stream copy of
+    that video, so no intermediate audio file is written or re-decoded.
+    """
     inputs = []
+    chains = []
     maps = []
-    for a in audioList:
+    for i, a in enumerate(audioList):
+        if offsets is not None:
+            inputs += ["-ss", f"{offsets[i]}"]
+            chains.append(f"[{i}:a:0]asetpts=PTS-STARTPTS[t{i}]; ")
+            maps.append(f"[t{i}]")
+        else:
+            maps.append(f"[{i}:a]")
         inputs += ["-i", str(a)]
-        maps.append(f"[{len(maps)}:a]")
 
     # Use longest so we don't accidentally truncate when one track is shorter
-    amix = f"{''.join(maps)}amix=inputs={len(audioList)}:duration=longest:normalize=0[aout]"
+    amix = f"{''.join(chains)}{''.join(maps)}amix=inputs={len(audioList)}:duration=longest:normalize=0[aout]"
+
+    video_args = []
+    if video_path is not None:
+        inputs += ["-i", str(video_path)]
+        video_args = [
+            "-map", f"{len(audioList)}:v:0",
+            "-c:v", "copy",
+            "-movflags", "+faststart",
+            "-shortest",
+        ]
 
     cmd = [
         "ffmpeg",
         "-y",
+        *FFMPEG_THREADING_FLAGS,
         *inputs,
-        "-filter_complex", amix,
+        *filter_complex_args(amix),
         "-map", "[aout]",
+        *video_args,
         "-c:a", "aac",
         "-b:a", "192k",
         str(outAudio),
     ]
-    run(cmd)
+    return cmd
 
 
 # --------------------------------------------------------------
@@ -93,27 +251,57 @@ def mixAudioTracksTimeline(
     outAudio: Path,
     offsets: list[float],
     target_duration: float | None = None,
+    video_path: Path | None = None,
 ):
-    inputs = []
+    subprocess.check_call(mixAudioTracksTimelineCmd(
+        audio_files, outAudio, offsets,
+        target_duration=target_duration, video_path=video_path,
+    ))
+
+
+def mixAudioTracksTimelineCmd(
+    audio_files: list[Path],
+    outAudio: Path,
+    offsets: list[float],
+    target_duration: float | None = None,
+    video_path: Path | None = None,
+) -> list:
+    """
+    audio_files may be the camera files themselves (first audio stream is
+    used), so no separate extraction pass is needed. With video_path the
+    mix is muxed straight into outAudio alongside a stream copy of that
+    video: one AAC encode and one file write for the whole audio path.
+    """
+    n = len(audio_files)
+    # Pad every stream to the target so amerge (which stops at its shortest
+    # input) runs to the end; without a target the caller must bound it.
+    apad = f"apad=whole_dur={target_duration}" if target_duration is not None else "apad"
+
     filter_parts = []
 
     for i, audio_file in enumerate(audio_files):
-        inputs += ["-i", str(audio_file)]
-
         delay_ms = max(0, int(offsets[i] * 1000))
 
         # 👇 THIS IS THE CRITICAL PART
         filter_parts.append(
-            f"[{i}:a]"
-            f"adelay={delay_ms}|{delay_ms},"
+            f"[{i}:a:0]"
+            f"asetpts=PTS-STARTPTS,"
+            f"aformat=channel_layouts=stereo,"
+            f"adelay={delay_ms}:all=1,"
             f"aresample=48000:first_pts=0,"
-            f"apad[a{i}]"
+            f"{apad}[a{i}]"
         )
 
-    mix_inputs = "".join(f"[a{i}]" for i in range(len(audio_files)))
+    # Unity-gain sum, same levels as amix normalize=0 in the trim path: each
+    # camera stays stereo, amerge lays them side by side (L0 R0 L1 R1 ...),
+    # and one pan adds the lefts and the rights back into a stereo pair.
+    mix_inputs = "".join(f"[a{i}]" for i in range(n))
+    left = "+".join(f"c{2 * i}" for i in range(n))
+    right = "+".join(f"c{2 * i + 1}" for i in range(n))
+    merge = f"{mix_inputs}amerge=inputs={n}," if n > 1 else f"{mix_inputs}"
 
     filter_parts.append(
-        f"{mix_inputs}amix=inputs={len(audio_files)}:normalize=0:duration=longest[aout]"
+        f"{merge}pan=stereo|c0={left}|c1={right}[aout]"
     )
 
     if target_duration is not None:
@@ -126,17 +314,29 @@ def mixAudioTracksTimeline(
 
     filter_complex = "; ".join(filter_parts)
 
+    video_args = []
+    if video_path is not None:
+        video_args = [
+            "-map", f"{len(audio_files)}:v:0",
+            "-c:v", "copy",
+            "-movflags", "+faststart",
+            "-shortest",
+        ]
+
     cmd = [
         "ffmpeg", "-y",
-        *sum([["-i", str(p)] for p in audio_files], []),
-        "-filter_complex", filter_complex,
+        *FFMPEG_THREADING_FLAGS,
+        *[arg for p in audio_files for arg in ("-i", str(p))],
+        *(["-i", str(video_path)] if video_path is not None else []),
+        *filter_complex_args(filter_complex),
         "-map", out_label,
+        *video_args,
         "-c:a", "aac",
         "-b:a", "192k",
         str(outAudio),
     ]
 
-    subprocess.check_call(cmd)
+    return cmd
 
 
 
@@ -144,21 +344,35 @@ def mixAudioTracksTimeline(
 # Video + Audio mux
 # --------------------------------------------------------------
 def muxVideoAudio(inVideo: Path, inAudio: Path, outFile: Path):
-    cmd = [
+    run(muxVideoAudioCmd(inVideo, inAudio, outFile))
+
+
+def muxVideoAudioCmd(inVideo: Path, inAudio: Path, outFile: Path, copy_audio: bool | None = None) -> list:
+    # Tracks from the extract/mix helpers above are already AAC; copy them
+    # instead of decoding and re-encoding AAC -> AAC. copy_audio=None probes
+    # inAudio, so pass it explicitly when the file doesn't exist yet.
+    if copy_audio is None:
+        copy_audio = audioCodec(inAudio) == "aac"
+
+    if copy_audio:
+        audio_args = ["-c:a", "copy"]
+    else:
+        audio_args = ["-c:a", "aac", "-b:a", "192k"]
+
+    return [
         "ffmpeg",
         "-y",
+        *FFMPEG_THREADING_FLAGS,
         "-i", str(inVideo),
         "-i", str(inAudio),
         "-map", "0:v:0",
         "-map", "1:a:0",
         "-c:v", "copy",
-        "-c:a", "aac",
-        "-b:a", "192k",
+        *audio_args,
         "-movflags", "+faststart",
         "-shortest",
         str(outFile),
     ]
-    run(cmd)
 
 
 def muxVideoWithTimelineAudio(
@@ -176,10 +390,10 @@ def muxVideoWithTimelineAudio(
     cmd = [
         "ffmpeg",
         "-y",
+        *FFMPEG_THREADING_FLAGS,
         "-i", str(video_path),
         "-i", str(audio_path),
-        "-filter_complex",
-        f"[1:a]adelay={delay_ms}|{delay_ms},apad,asetpts=PTS-STARTPTS[a]",
+        *filter_complex_args(f"[1:a]adelay={delay_ms}|{delay_ms},apad,asetpts=PTS-STARTPTS[a]"),
         "-map", "0:v:0",
         "-map", "[a]",
         "-c:v", "copy",
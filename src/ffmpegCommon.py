@@ -1,5 +1,14 @@
 # ffmpegCommon.py
 
+import atexit
+import functools
+import os
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
 IOS_SAFE_VIDEO_FLAGS = [
     "-pix_fmt", "yuv420p",
     "-tag:v", "hvc1",
@@ -11,6 +20,11 @@ IOS_SAFE_INPUT_FLAGS = [
     "-noautorotate",
 ]
 
+# NVDEC decode for the CPU filtergraphs: put before each camera's -ss/-i.
+# Without -hwaccel_output_format the frames download to system memory, so
+# crop/pad/hflip/stack filters keep working unchanged.
+NVDEC_INPUT_FLAGS = ["-hwaccel", "cuda"]
+
 NVENC_HEVC_QUALITY = [
     "-c:v", "hevc_nvenc",
     "-preset", "p6",
@@ -20,3 +34,170 @@ NVENC_HEVC_QUALITY = [
     "-aq-strength", "8",
     "-rc-lookahead", "32",
 ]
+
+# Throughput-biased HEVC for renders that get re-encoded or discarded later:
+# faster preset, no AQ, short lookahead, B-frames as references.
+NVENC_HEVC_FAST = [
+    "-c:v", "hevc_nvenc",
+    "-preset", "p4",
+    "-rc", "vbr",
+    "-rc-lookahead", "8",
+    "-bf", "3",
+    "-b_ref_mode", "middle",
+]
+
+# Max-throughput HEVC for batch runs where wall-clock beats quality:
+# fastest preset, low-latency tune, no lookahead, AQ or B-frames.
+NVENC_HEVC_SPEED = [
+    "-c:v", "hevc_nvenc",
+    "-preset", "p1",
+    "-tune", "ll",
+    "-rc", "cbr",
+    "-rc-lookahead", "0",
+    "-spatial_aq", "0",
+    "-temporal_aq", "0",
+    "-bf", "0",
+]
+
+# Opt-in (REEL_LOWLATENCY=1) for offline batches: no B-frames and no
+# reorder buffering in NVENC. Splice it after any encoder tail that sets
+# -bf/-b_ref_mode so these win. Empty by default so the quality path is
+# unchanged.
+NVENC_LOWLATENCY_FLAGS = (
+    ["-tune", "ll", "-delay", "0", "-bf", "0", "-b_ref_mode", "disabled"]
+    if os.environ.get("REEL_LOWLATENCY") == "1" else []
+)
+
+# Default NVENC preset of the timeline layouts (p1 fastest … p7 best);
+# they pair it with -tune hq -multipass qres for batch throughput.
+TIMELINE_NVENC_PRESET = "p2"
+
+# Layout encoder tail: AQ and lookahead off (invisible on short social
+# clips), two B-frames used as references, one reference frame.
+NVENC_THROUGHPUT_FLAGS = [
+    "-spatial_aq", "0",
+    "-temporal_aq", "0",
+    "-rc-lookahead", "0",
+    "-bf", "2",
+    "-b_ref_mode", "middle",
+    "-refs", "1",
+]
+
+NVENC_HEVC_PRESETS = {
+    "speed": NVENC_HEVC_SPEED,
+    "balanced": NVENC_HEVC_FAST,
+    "quality": NVENC_HEVC_QUALITY,
+}
+
+# Let every filter (and the complex graph) run multi-threaded; ffmpeg
+# otherwise keeps most audio filters and stacked video graphs on one thread.
+FFMPEG_THREADING_FLAGS = [
+    "-threads", "0",
+    "-filter_threads", str(os.cpu_count() or 1),
+    "-filter_complex_threads", str(os.cpu_count() or 1),
+]
+
+# Filtergraphs longer than this go to ffmpeg as a script file rather than
+# on argv (Linux caps any single argv string at 128 KiB).
+FILTER_SCRIPT_THRESHOLD = 8192
+
+# Watermark overlaid by the generate* scripts (/app/assets in the image)
+LOGO = Path(__file__).resolve().parent.parent / "assets" / "reelchains_logo.png"
+
+
+@functools.cache
+def logo_path() -> Path:
+    # One stat per process, however many productions it renders
+    if not LOGO.exists():
+        raise FileNotFoundError(f"Missing logo file at {LOGO}")
+    return LOGO
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def filter_complex_args(filtergraph: str) -> list:
+    if len(filtergraph) <= FILTER_SCRIPT_THRESHOLD:
+        return ["-filter_complex", filtergraph]
+
+    with tempfile.NamedTemporaryFile("w", suffix=".ffgraph", delete=False) as f:
+        f.write(filtergraph)
+    atexit.register(_remove_quietly, f.name)
+    return ["-filter_complex_script", f.name]
+
+
+class FfmpegDAG:
+    """
+    ffmpeg commands with dependencies. run() starts each command as soon as
+    every command it depends on has finished, up to `workers` at a time.
+    On the first failure the other running commands are killed and it raises.
+    """
+
+    def __init__(self):
+        self._nodes = []  # (cmd, deps, capture)
+        self._procs = []
+        self._lock = threading.Lock()
+        self._cancelled = False
+
+    def add(self, cmd: list, deps=(), capture: bool = False) -> int:
+        self._nodes.append((cmd, tuple(deps), capture))
+        return len(self._nodes) - 1
+
+    def _run_node(self, cmd: list, capture: bool):
+        print("➡️", " ".join(cmd))
+        # capture holds stderr back so concurrent logs don't interleave.
+        # Spawn under the lock so a failure elsewhere either sees this
+        # process to kill it, or stops it from being started at all.
+        with self._lock:
+            if self._cancelled:
+                return
+            proc = subprocess.Popen(
+                cmd,
+                stdin=subprocess.DEVNULL,
+                stderr=subprocess.PIPE if capture else None,
+                text=True,
+                close_fds=False,
+            )
+            self._procs.append(proc)
+        _, err = proc.communicate()
+        if proc.returncode != 0:
+            if err:
+                print(err)
+            raise RuntimeError(f"Command failed: {cmd}")
+
+    def run(self, workers: int | None = None):
+        workers = workers or os.cpu_count() or 1
+        pending = list(range(len(self._nodes)))
+        running = {}
+        done = set()
+
+        ex = ThreadPoolExecutor(max_workers=workers)
+        try:
+            while pending or running:
+                ready = [i for i in pending if done.issuperset(self._nodes[i][1])]
+                for i in ready:
+                    pending.remove(i)
+                    cmd, _, capture = self._nodes[i]
+                    running[ex.submit(self._run_node, cmd, capture)] = i
+
+                if not running:
+                    # Nothing can start: a dep index that was never added, or a cycle
+                    raise RuntimeError(f"Unsatisfiable dependencies for commands: {pending}")
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for f in finished:
+                    done.add(running.pop(f))
+                    f.result()
+        except BaseException:
+            with self._lock:
+                self._cancelled = True
+                for proc in self._procs:
+                    if proc.poll() is None:
+                        proc.kill()
+            raise
+        finally:
+            ex.shutdown(wait=True, cancel_futures=True)
@@ -4,7 +4,9 @@
 from ffmpegCommon import (
     IOS_SAFE_VIDEO_FLAGS,
     IOS_SAFE_INPUT_FLAGS,
-    NVENC_HEVC_QUALITY,
+    FFMPEG_THREADING_FLAGS,
+    NVENC_HEVC_PRESETS,
+    filter_complex_args,
 )
 
 def build_video_command(
@@ -12,8 +14,11 @@ def build_video_command(
     filtergraph,
     output_path,
     bitrate="3.8M",
+    quality="quality",
 ):
-    cmd = ["ffmpeg", "-y"]
+    # "balanced"/"speed" only for intermediates or throughput-bound batches;
+    # finals stay "quality"
+    cmd = ["ffmpeg", "-y", *FFMPEG_THREADING_FLAGS]
 
     cmd += IOS_SAFE_INPUT_FLAGS
 
@@ -21,11 +26,11 @@ def build_video_command(
         cmd += ["-ss", str(ss), "-i", str(path)]
 
     cmd += [
-        "-filter_complex", filtergraph,
+        *filter_complex_args(filtergraph),
         "-map", "[outv]",
     ]
 
-    cmd += NVENC_HEVC_QUALITY
+    cmd += NVENC_HEVC_PRESETS[quality]
     cmd += ["-b:v", bitrate]
     cmd += IOS_SAFE_VIDEO_FLAGS
 
@@ -34,7 +34,8 @@ from layouts.hi5 import buildHi5TwoPortraitCmd
 
 def run(cmd: list):
     print("➡️", " ".join(cmd))
-    r = subprocess.run(cmd)
+    # argv list, no shell; DEVNULL keeps ffmpeg off the terminal's stdin
+    r = subprocess.run(cmd, stdin=subprocess.DEVNULL, close_fds=False)
     if r.returncode != 0:
         raise RuntimeError(f"Command failed: {cmd}")
 
@@ -44,8 +45,9 @@ def count_orientations(orientations):
         return portraits, landscapes
 
     
-def renderFinalVideo(localPaths, orientations, offsets, outVideo: Path, 
-                     startTimes, baseDuration, production_type, is_left_hand):
+def buildFinalVideoCmd(localPaths, orientations, offsets, outVideo: Path,
+                       startTimes, baseDuration, production_type, is_left_hand):
+    """Picks the layout; returns (ffmpeg cmd, render_mode)."""
     n = len(localPaths)
 
     render_mode = "trim"
@@ -107,10 +109,20 @@ def renderFinalVideo(localPaths, orientations, offsets, outVideo: Path,
 
     else:
         raise ValueError("Invalid number of inputs.")
-    
+
+    return cmd, render_mode
+
+
+def renderFinalVideo(localPaths, orientations, offsets, outVideo: Path,
+                     startTimes, baseDuration, production_type, is_left_hand):
+    cmd, render_mode = buildFinalVideoCmd(
+        localPaths, orientations, offsets, outVideo,
+        startTimes, baseDuration, production_type, is_left_hand,
+    )
     run(cmd)
 
     return render_mode
 
 
+
     
@@ -4,10 +4,9 @@ import subprocess
 import sys
 from pathlib import Path
 
-PAD_COLOR = "0x5762FF"
+from ffmpegCommon import FFMPEG_THREADING_FLAGS, NVDEC_INPUT_FLAGS, filter_complex_args, logo_path
 
-SCRIPT_DIR = Path(__file__).resolve().parent
-LOGO = SCRIPT_DIR.parent / "assets" / "reelchains_logo.png"
+PAD_COLOR = "0x5762FF"
 
 
 def run_ffmpeg(cam1, mode1, cam2, mode2, voff1, outname):
@@ -16,8 +15,10 @@ def run_ffmpeg(cam1, mode1, cam2, mode2, voff1, outname):
     Preserves *all* filter logic exactly.
     """
 
-    if not LOGO.exists():
-        print(f"❌ Missing logo file at {LOGO}")
+    try:
+        logo = logo_path()
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
         sys.exit(1)
 
     print("🎬 2-landscape vertical production using amerge + center-mix audio…")
@@ -46,26 +47,25 @@ def run_ffmpeg(cam1, mode1, cam2, mode2, voff1, outname):
 
     [a0][a1]amerge=inputs=2[stereo_raw];
 
-    [stereo_raw]pan=mono|c0=0.5*c0+0.5*c1[mix_mono];
-    [mix_mono]pan=stereo|c0=c0|c1=c0[aout];
+    [stereo_raw]pan=stereo|c0=0.5*c0+0.5*c1|c1=0.5*c0+0.5*c1[aout];
     """
 
     cmd = [
         "ffmpeg",
         "-y",
-        "-ss", str(voff1), "-i", str(cam1),
-        "-ss", "0", "-i", str(cam2),
-        "-i", str(LOGO),
-        "-filter_complex", filter_complex,
+        "-nostdin", "-hide_banner",
+        *FFMPEG_THREADING_FLAGS,
+        *NVDEC_INPUT_FLAGS, "-ss", str(voff1), "-i", str(cam1),
+        *NVDEC_INPUT_FLAGS, "-ss", "0", "-i", str(cam2),
+        "-i", str(logo),
+        *filter_complex_args(filter_complex),
         "-map", "[final_v]",
         "-map", "[aout]",
         "-ac", "2",
         "-vsync", "cfr",
         "-r", "30",
-            # --- NVENC video encoding ---
-        "-map", "[outv]",
-        "-map", "[aout]",
 
+        # --- NVENC video encoding ---
         "-c:v", "hevc_nvenc",
         "-preset", "p4",                  # Good speed/quality balance for T4
         "-rc:v", "vbr_hq",                # Quality-focused rate control
@@ -79,7 +79,7 @@ def run_ffmpeg(cam1, mode1, cam2, mode2, voff1, outname):
     ]
 
     print("➡️ Running ffmpeg (2-landscape)…")
-    subprocess.run(cmd, check=True)
+    subprocess.run(cmd, check=True, stdin=subprocess.DEVNULL)
 
     print(f"✅ 2-landscape production created: {outname}")
 
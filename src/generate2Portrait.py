@@ -5,16 +5,16 @@ import subprocess
 import sys
 from pathlib import Path
 
+from ffmpegCommon import logo_path
+from ffmpegAudioTools import mergeMixFilter
+
 # Constants matching your Bash script
 TARGET_W = 1920
 TARGET_H = 1080
 PAD_COLOR = "0x5762FF"
 
-SCRIPT_DIR = Path(__file__).resolve().parent
-LOGO = SCRIPT_DIR.parent / "assets" / "reelchains_logo.png"
-
 
-def run_ffmpeg(cam1, cam2, voff1, outname):
+def run_ffmpeg(cam1, cam2, voff1, outname, audio_mix="amix"):
     # CROP_H_FACTOR env var like in the bash script (default 0.8)
     crop_h_factor_str = os.environ.get("CROP_H_FACTOR", "0.8")
     try:
@@ -23,14 +23,19 @@ def run_ffmpeg(cam1, cam2, voff1, outname):
         print(f"⚠️ Invalid CROP_H_FACTOR='{crop_h_factor_str}', falling back to 0.8")
         crop_h_factor = 0.8
 
-    if not LOGO.exists():
-        print(f"❌ Missing logo file at {LOGO}")
+    try:
+        logo = logo_path()
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
         sys.exit(1)
 
     print("🎬 Building 2-portrait production (height-normalized)…")
     print(f"📹 CAM1: {cam1} (trim {voff1} s)")
     print(f"📹 CAM2: {cam2}")
     print(f"🎞 OUT : {outname}")
+
+    a_fmt, mix = mergeMixFilter(2, audio_mix)
+
     print(f"DEBUG CAM1=<{cam1}>")
     print(f"DEBUG CAM2=<{cam2}>")
 
@@ -52,17 +57,18 @@ def run_ffmpeg(cam1, cam2, voff1, outname):
     [logo]lut=a='val*0.7'[logo_half];
     [bg][logo_half]overlay=(W-w)-48:(H-h)-48,format=yuv420p[outv];
 
-    [0:a]aresample=async=1:first_pts=0[a0];
-    [1:a]aresample=async=1:first_pts=0[a1];
-    [a0][a1]amix=inputs=2:normalize=0:duration=longest[aout];
+    [0:a]aresample=async=1:first_pts=0{a_fmt}[a0];
+    [1:a]aresample=async=1:first_pts=0{a_fmt}[a1];
+    {mix};
     """
 
     cmd = [
         "ffmpeg",
         "-y",
+        "-nostdin", "-hide_banner",
         "-ss", str(voff1), "-i", str(cam1),
         "-i", str(cam2),
-        "-i", str(LOGO),
+        "-i", str(logo),
         "-filter_complex", filter_complex,
         "-map", "[outv]",
         "-map", "[aout]",
@@ -77,7 +83,7 @@ def run_ffmpeg(cam1, cam2, voff1, outname):
     print("➡️ Running ffmpeg (2-portrait)…")
     # print(" ".join(cmd))  # uncomment for full command debug
 
-    result = subprocess.run(cmd)
+    result = subprocess.run(cmd, stdin=subprocess.DEVNULL)
     if result.returncode != 0:
         print(f"❌ FFmpeg failed with status {result.returncode}")
         sys.exit(result.returncode)
@@ -93,6 +99,7 @@ def main():
     parser.add_argument("cam2", help="CAM2 path")
     parser.add_argument("offset1", type=float, help="Seconds to trim from CAM1")
     parser.add_argument("outname", help="Output filename")
+    parser.add_argument("--audio-mix", choices=("amix", "amerge"), default="amix")
 
     args = parser.parse_args()
 
@@ -109,7 +116,7 @@ def main():
 
     outname.parent.mkdir(parents=True, exist_ok=True)
 
-    run_ffmpeg(cam1, cam2, args.offset1, outname)
+    run_ffmpeg(cam1, cam2, args.offset1, outname, args.audio_mix)
 
 
 if __name__ == "__main__":
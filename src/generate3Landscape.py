@@ -4,19 +4,20 @@ import subprocess
 import sys
 from pathlib import Path
 
+from ffmpegCommon import FFMPEG_THREADING_FLAGS, NVDEC_INPUT_FLAGS, filter_complex_args, logo_path
+
 PAD_COLOR = "0x5762FF"
 TILE_W = 1080
 TILE_H = 1080
 CANVAS_W = TILE_W
 CANVAS_H = TILE_H * 3
 
-SCRIPT_DIR = Path(__file__).resolve().parent
-LOGO = SCRIPT_DIR.parent / "assets" / "reelchains_logo.png"
-
 
 def run_ffmpeg(cam1, cam2, cam3, off1, off2, off3, outname: Path):
-    if not LOGO.exists():
-        print(f"❌ Missing logo file at {LOGO}")
+    try:
+        logo = logo_path()
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
         sys.exit(1)
 
     print("🎬 3-landscape vertical stack production…")
@@ -56,7 +57,7 @@ def run_ffmpeg(cam1, cam2, cam3, off1, off2, off3, outname: Path):
 
     #######################################################
     # AUDIO: 3-way center-mixed stereo
-    # (amerge to multichannel, then collapse to mono, then dual-mono)
+    # (amerge to multichannel, then one pan to dual-mono)
     #######################################################
     [0:a]asetpts=PTS-STARTPTS[a0];
     [1:a]asetpts=PTS-STARTPTS[a1];
@@ -64,21 +65,20 @@ def run_ffmpeg(cam1, cam2, cam3, off1, off2, off3, outname: Path):
 
     [a0][a1][a2]amerge=inputs=3[stereo_raw];
 
-    # Collapse to mono (equal mix)
-    [stereo_raw]pan=mono|c0=(1/3)*c0+(1/3)*c1+(1/3)*c2[mix_mono];
-
-    # Dual-mono stereo
-    [mix_mono]pan=stereo|c0=c0|c1=c0[aout];
+    # Equal mix into both channels (dual-mono stereo)
+    [stereo_raw]pan=stereo|c0=0.3333*c0+0.3333*c1+0.3333*c2|c1=0.3333*c0+0.3333*c1+0.3333*c2[aout];
     """
 
     cmd = [
         "ffmpeg",
         "-y",
-        "-ss", str(off1), "-i", str(cam1),
-        "-ss", str(off2), "-i", str(cam2),
-        "-ss", str(off3), "-i", str(cam3),
-        "-i", str(LOGO),
-        "-filter_complex", filter_complex,
+        "-nostdin", "-hide_banner",
+        *FFMPEG_THREADING_FLAGS,
+        *NVDEC_INPUT_FLAGS, "-ss", str(off1), "-i", str(cam1),
+        *NVDEC_INPUT_FLAGS, "-ss", str(off2), "-i", str(cam2),
+        *NVDEC_INPUT_FLAGS, "-ss", str(off3), "-i", str(cam3),
+        "-i", str(logo),
+        *filter_complex_args(filter_complex),
         "-map", "[outv]",
         "-map", "[aout]",
         "-ac", "2",
@@ -93,7 +93,7 @@ def run_ffmpeg(cam1, cam2, cam3, off1, off2, off3, outname: Path):
     ]
 
     print("➡️ Running ffmpeg (3-landscape)…")
-    subprocess.run(cmd, check=True)
+    subprocess.run(cmd, check=True, stdin=subprocess.DEVNULL)
     print(f"✅ 3-landscape production created: {outname}")
 
 
@@ -4,19 +4,21 @@ import subprocess
 import sys
 from pathlib import Path
 
+from ffmpegCommon import filter_complex_args, logo_path
+from ffmpegAudioTools import mergeMixFilter
+
 PAD_COLOR = "0x5762FF"
 TILE_W = 1080
 TILE_H = 1080
 CANVAS_W = TILE_W * 3
 CANVAS_H = TILE_H
 
-SCRIPT_DIR = Path(__file__).resolve().parent
-LOGO = SCRIPT_DIR.parent / "assets" / "reelchains_logo.png"
-
 
-def run_ffmpeg(cam1, cam2, cam3, off1, off2, off3, outname: Path):
-    if not LOGO.exists():
-        print(f"❌ Missing logo file at {LOGO}")
+def run_ffmpeg(cam1, cam2, cam3, off1, off2, off3, outname: Path, audio_mix="amix"):
+    try:
+        logo = logo_path()
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
         sys.exit(1)
 
     print("🎬 3-portrait side-by-side production…")
@@ -25,19 +27,21 @@ def run_ffmpeg(cam1, cam2, cam3, off1, off2, off3, outname: Path):
     print(f"📹 CAM3: {cam3} (trim {off3} s)")
     print(f"🎞 OUT : {outname}")
 
+    a_fmt, mix = mergeMixFilter(3, audio_mix)
+
     filter_complex = f"""
     #######################################################
     # VIDEO: 3 portrait clips → 3 square tiles → hstack
     #######################################################
-    [0:v]setpts=PTS-STARTPTS,
+    [0:v]fps=30,setpts=PTS-STARTPTS,
          scale={TILE_W}:-1:force_original_aspect_ratio=decrease,
          crop={TILE_W}:{TILE_H}:(iw-{TILE_W})/2:(ih-{TILE_H})/2[v0];
 
-    [1:v]setpts=PTS-STARTPTS,
+    [1:v]fps=30,setpts=PTS-STARTPTS,
          scale={TILE_W}:-1:force_original_aspect_ratio=decrease,
          crop={TILE_W}:{TILE_H}:(iw-{TILE_W})/2:(ih-{TILE_H})/2[v1];
 
-    [2:v]setpts=PTS-STARTPTS,
+    [2:v]fps=30,setpts=PTS-STARTPTS,
          scale={TILE_W}:-1:force_original_aspect_ratio=decrease,
          crop={TILE_W}:{TILE_H}:(iw-{TILE_W})/2:(ih-{TILE_H})/2[v2];
 
@@ -55,22 +59,23 @@ def run_ffmpeg(cam1, cam2, cam3, off1, off2, off3, outname: Path):
     [bg][logo_half]overlay=(W-w)-48:(H-h)-48,format=yuv420p[outv];
 
     #######################################################
-    # AUDIO: 3-way amix (mono/stereo depending on source)
+    # AUDIO: 3-way amix or amerge+pan (see audio_mix above)
     #######################################################
-    [0:a]aresample=async=1:first_pts=0[a0];
-    [1:a]aresample=async=1:first_pts=0[a1];
-    [2:a]aresample=async=1:first_pts=0[a2];
-    [a0][a1][a2]amix=inputs=3:normalize=0:duration=longest[aout];
+    [0:a]aresample=async=1:first_pts=0{a_fmt}[a0];
+    [1:a]aresample=async=1:first_pts=0{a_fmt}[a1];
+    [2:a]aresample=async=1:first_pts=0{a_fmt}[a2];
+    {mix};
     """
 
     cmd = [
         "ffmpeg",
         "-y",
+        "-nostdin", "-hide_banner",
         "-ss", str(off1), "-i", str(cam1),
         "-ss", str(off2), "-i", str(cam2),
         "-ss", str(off3), "-i", str(cam3),
-        "-i", str(LOGO),
-        "-filter_complex", filter_complex,
+        "-i", str(logo),
+        *filter_complex_args(filter_complex),
         "-map", "[outv]",
         "-map", "[aout]",
         "-c:v", "hevc_videotoolbox",
@@ -82,7 +87,7 @@ def run_ffmpeg(cam1, cam2, cam3, off1, off2, off3, outname: Path):
     ]
 
     print("➡️ Running ffmpeg (3-portrait)…")
-    subprocess.run(cmd, check=True)
+    subprocess.run(cmd, check=True, stdin=subprocess.DEVNULL)
     print(f"✅ 3-portrait production created: {outname}")
 
 
@@ -97,6 +102,7 @@ def main():
     parser.add_argument("offset2", type=float, help="Trim seconds for CAM2")
     parser.add_argument("offset3", type=float, help="Trim seconds for CAM3")
     parser.add_argument("outname")
+    parser.add_argument("--audio-mix", choices=("amix", "amerge"), default="amix")
 
     args = parser.parse_args()
 
@@ -112,7 +118,7 @@ def main():
 
     outname.parent.mkdir(parents=True, exist_ok=True)
 
-    run_ffmpeg(cam1, cam2, cam3, args.offset1, args.offset2, args.offset3, outname)
+    run_ffmpeg(cam1, cam2, cam3, args.offset1, args.offset2, args.offset3, outname, args.audio_mix)
 
 
 if __name__ == "__main__":
@@ -4,6 +4,9 @@ import subprocess
 import sys
 from pathlib import Path
 
+from ffmpegCommon import NVDEC_INPUT_FLAGS, NVENC_HEVC_PRESETS, NVENC_LOWLATENCY_FLAGS, logo_path
+from ffmpegAudioTools import mergeMixFilter
+
 """
 Python port of generateMixedPortraitLandscape.sh
 
@@ -19,12 +22,6 @@ TARGET_W = 1080
 TOP_H = 1200        # portrait zone
 BOTTOM_H = 800      # landscape zone
 
-SCRIPT_DIR = Path(__file__).resolve().parent
-LOGO = SCRIPT_DIR.parent / "assets" / "reelchains_logo.png"
-
-if not LOGO.exists():
-    print(f"❌ Missing watermark logo file at {LOGO}")
-    sys.exit(1)
 
 def validate_mode(label: str, mode: str):
     m = mode.lower().strip()
@@ -33,7 +30,7 @@ def validate_mode(label: str, mode: str):
     return m
 
 
-def build_filter(mode1, mode2, voff1):
+def build_filter(mode1, mode2, voff1, audio_mix="amix"):
     """
     Builds the filter_complex string EXACTLY like your shell script.
     """
@@ -49,14 +46,16 @@ def build_filter(mode1, mode2, voff1):
         LAND_V = "[0:v]"
         LAND_A = "[0:a]"
 
+    a_fmt, mix = mergeMixFilter(2, audio_mix)
+
     # Build the same filter used in the Bash script
     filter_complex = f"""
-    {PORTRAIT_V}setpts=PTS-STARTPTS,
+    {PORTRAIT_V}fps=30,setpts=PTS-STARTPTS,
          crop=in_w:in_h*0.80:0:(in_h - in_h*0.80)/2,
          scale={TARGET_W}:{TOP_H}:force_original_aspect_ratio=decrease,
          pad={TARGET_W}:{TOP_H}:(ow-iw)/2:(oh-ih)/2:{PAD_COLOR}[top];
 
-    {LAND_V}setpts=PTS-STARTPTS,
+    {LAND_V}fps=30,setpts=PTS-STARTPTS,
          crop=in_w*0.80:in_h:(in_w - in_w*0.80)/2:0,
          scale={TARGET_W}:-1:force_original_aspect_ratio=decrease,
          pad={TARGET_W}:{BOTTOM_H}:(ow-iw)/2:(oh-ih)/2:{PAD_COLOR}[bottom];
@@ -67,26 +66,28 @@ def build_filter(mode1, mode2, voff1):
     [logo]lut=a='val*0.50'[logo_half];
     [bg][logo_half]overlay=(W-w)-40:(H-h)-40[outv];
 
-    {PORTRAIT_A}aresample=async=1:first_pts=0[a0];
-    {LAND_A}aresample=async=1:first_pts=0[a1];
-    [a0][a1]amix=inputs=2:normalize=0:duration=longest[aout]
+    {PORTRAIT_A}aresample=async=1:first_pts=0{a_fmt}[a0];
+    {LAND_A}aresample=async=1:first_pts=0{a_fmt}[a1];
+    {mix}
     """
     return filter_complex
 
 
-def run_ffmpeg(clip1, clip2, mode1, mode2, voff1, outname):
+def run_ffmpeg(clip1, clip2, mode1, mode2, voff1, outname, quality="balanced",
+               audio_mix="amix"):
     """
     Executes ffmpeg using the same parameters you had in Bash.
     Uses hevc_videotoolbox for Apple Silicon macOS.
     """
 
-    filter_complex = build_filter(mode1, mode2, voff1)
+    filter_complex = build_filter(mode1, mode2, voff1, audio_mix)
 
     cmd = [
         "ffmpeg", "-y",
-        "-ss", str(offset1), "-i", str(clip1),
-        "-ss", "0",           "-i", str(clip2),
-        "-i", "/app/assets/reelchains_logo.png",
+        "-nostdin", "-hide_banner",
+        *NVDEC_INPUT_FLAGS, "-ss", str(voff1), "-i", str(clip1),
+        *NVDEC_INPUT_FLAGS, "-ss", "0",           "-i", str(clip2),
+        "-i", str(logo_path()),
 
         "-filter_complex", filter_complex,
 
@@ -98,10 +99,10 @@ def run_ffmpeg(clip1, clip2, mode1, mode2, voff1, outname):
         "-map", "[outv]",
         "-map", "[aout]",
 
-        "-c:v", "hevc_nvenc",
-        "-preset", "p4",                  # Good speed/quality balance for T4
-        "-rc:v", "vbr_hq",                # Quality-focused rate control
+        *NVENC_HEVC_PRESETS[quality],     # balanced = p4, good for T4
+        *NVENC_LOWLATENCY_FLAGS,
         "-b:v", "12M",                    # Reasonable high quality bitrate
+        "-g", "120",                      # 4 s GOP at 30 fps
         "-pix_fmt", "yuv420p",            # iPhone-compatible
 
         # Audio
@@ -119,7 +120,7 @@ def run_ffmpeg(clip1, clip2, mode1, mode2, voff1, outname):
     print("🎬 Running ffmpeg...")
     print(" ".join(cmd))
 
-    subprocess.run(cmd, check=True)
+    subprocess.run(cmd, check=True, stdin=subprocess.DEVNULL)
     print("✅ Mixed layout done!")
 
 
@@ -131,6 +132,8 @@ def main():
     parser.add_argument("mode2")
     parser.add_argument("offset1", type=float)
     parser.add_argument("outname")
+    parser.add_argument("--quality", choices=sorted(NVENC_HEVC_PRESETS), default="balanced")
+    parser.add_argument("--audio-mix", choices=("amix", "amerge"), default="amix")
 
     args = parser.parse_args()
 
@@ -155,8 +158,10 @@ def main():
         sys.exit(1)
 
     # Validate logo
-    if not Path(LOGO).exists():
-        print(f"❌ Missing watermark logo file: {LOGO}")
+    try:
+        logo_path()
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
         sys.exit(1)
 
     print("🎬 Mixed portrait+landscape layout (Python version)")
@@ -164,7 +169,8 @@ def main():
     print(f"➡️ CLIP2 = {clip2} ({mode2})")
     print(f"🎞 Output = {outname}")
 
-    run_ffmpeg(clip1, clip2, mode1, mode2, args.offset1, outname)
+    run_ffmpeg(clip1, clip2, mode1, mode2, args.offset1, outname, args.quality,
+               args.audio_mix)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,15 @@
 import argparse
 import sys
 import mysql.connector
+from mysql.connector import pooling
 import subprocess
 import json
+import threading
+import time
+import importlib.util
+from pathlib import Path
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
 # DB CONFIG
 config = {
@@ -13,12 +20,11 @@ config = {
   'raise_on_warnings': True
 }
 
-def get_payload_from_db(production_id):
-    # 1. Define the format string as a variable (Standard MySQL syntax, no double % needed)
-    iso_format = '%Y-%m-%dT%H:%i:%s.%fZ'
+# Standard MySQL DATE_FORMAT syntax (no double % needed); bound as a parameter
+ISO_FORMAT = '%Y-%m-%dT%H:%i:%s.%fZ'
 
-    # 2. Use %s placeholders for BOTH the date format and the ID
-    query = """
+# Use %s placeholders for BOTH the date format and the ID
+PAYLOAD_QUERY = """
     SELECT JSON_OBJECT(
         'productionId', p.id,
         'bucket', 'reel-prod', 
@@ -43,19 +49,41 @@ def get_payload_from_db(production_id):
     JOIN collaborations c ON pm.collaboration_id = c.id
     WHERE p.id = %s
     """
-    
+
+
+DB_POOL_SIZE = 4
+# get_connection() raises instead of waiting when the pool is empty
+_db_slots = threading.BoundedSemaphore(DB_POOL_SIZE)
+
+
+@lru_cache(maxsize=1)
+def _get_pool():
+    # One pool per process: concurrent --parallel jobs reuse connections
+    # instead of paying a TCP + auth handshake per production.
+    return pooling.MySQLConnectionPool(pool_name="launch", pool_size=DB_POOL_SIZE, **config)
+
+
+def get_payload_from_db(production_id):
+    with _db_slots:
+        return _fetch_payload(production_id)
+
+
+def _fetch_payload(production_id):
     try:
-        cnx = mysql.connector.connect(**config)
-        cursor = cnx.cursor()
+        cnx = _get_pool().get_connection()
+        # Server-side prepared statement, parsed once per connection
+        cursor = cnx.cursor(prepared=True)
         
-        # 3. Pass parameters in the order they appear in the query:
-        #    First %s is the format string, Second %s is the production ID
-        cursor.execute(query, (iso_format, production_id))
+        # Pass parameters in the order they appear in the query:
+        # First %s is the format string, Second %s is the production ID
+        cursor.execute(PAYLOAD_QUERY, (ISO_FORMAT, production_id))
         
         row = cursor.fetchone()
         
         if row and row[0]:
-            return row[0]
+            payload = row[0]
+            # prepared cursors hand JSON back as bytes
+            return payload.decode() if isinstance(payload, (bytes, bytearray)) else payload
         else:
             print("❌ Production not found or no clips attached.")
             return None
@@ -68,23 +96,97 @@ def get_payload_from_db(production_id):
         if 'cnx' in locals(): cnx.close()
 
 
+# Job entry point per worker script, for running a single job in-process
+JOB_ENTRYPOINTS = {
+    "ai-analysis.py": "run_analysis_job",
+    "ai-vision.py": "run_vision_job",
+    "ai_analysis_worker_v2.py": "run_analysis_job",
+}
+
+
+def _load_script(ai_script):
+    # Worker scripts have hyphenated names, so load them by path
+    path = Path(__file__).resolve().parent / ai_script
+    spec = importlib.util.spec_from_file_location(path.stem.replace("-", "_"), path)
+    mod = importlib.util.module_from_spec(spec)
+    # Register before exec so pickling module-level functions (v2's spawn
+    # ProcessPoolExecutor) resolves back to this same module object
+    sys.modules[spec.name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def run_in_process(ai_script, json_payload, workdir):
+    mod = _load_script(ai_script)
+    try:
+        getattr(mod, JOB_ENTRYPOINTS[ai_script])(json_payload, workdir)
+        # v2 and vision upload in the background; flush before returning
+        if hasattr(mod, "_wait_for_uploads"):
+            mod._wait_for_uploads()
+        return 0
+    except Exception as e:
+        print(f"❌ Critical Failure: {e}", file=sys.stderr)
+        return 1
+
+
+# Stagger between launches so concurrent jobs don't hit GPU init at once
+LAUNCH_STAGGER_S = 0.2
+
+
+def run_analysis(production_id, ai_script, workdir, print_only=False, delay=0.0,
+                 in_process=False):
+    # 1. Get JSON from DB
+    print(f"🔎 Fetching data for production: {production_id}")
+    json_payload = get_payload_from_db(production_id)
+
+    if not json_payload:
+        return 1
+
+    # Validate here so empty productions never start a worker
+    payload = json.loads(json_payload)
+    if not payload.get("inputs"):
+        print(f"❌ Production {production_id} has no completed clips.")
+        return 1
+
+    if print_only:
+        print(f"{json_payload}")
+        return 0
+
+    time.sleep(delay)
+    print(f"🚀 Launching AI Analysis ({production_id})...")
+
+    if in_process:
+        # Skips a second interpreter start-up and the payload round trip on argv
+        return run_in_process(ai_script, json_payload, workdir)
+
+    # Use sys.executable to guarantee we use the venv python
+    r = subprocess.run([
+        sys.executable,        # <--- Change 1: Uses the current venv python
+        ai_script,
+        "--payload", json_payload,
+        "--workdir", workdir # <--- Change 2: Use a local folder
+    ], stdin=subprocess.DEVNULL)
+    if r.returncode != 0:
+        print(f"❌ Job {production_id} failed with exit code {r.returncode}")
+    return r.returncode
+
+
 # --- MAIN EXECUTION ---
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Launch AI Analysis from DB")
-    parser.add_argument("production_id", help="UUID of the production to analyze")
+    parser.add_argument("production_id", nargs="+", help="UUID(s) of the production(s) to analyze")
     parser.add_argument("--audit", action="store_true", help="Run in Audit Mode (Single clip analysis)")
     parser.add_argument("--vision", action="store_true", help="Run in Vision Mode (Single clip analysis)")
     parser.add_argument("--print", action="store_true", help="Print the command")
+    parser.add_argument("--parallel", type=int, default=2, help="Productions to run at once")
+    parser.add_argument("--subprocess", action="store_true",
+                        help="Run a single production in a fresh worker process instead of in-process")
 
     args = parser.parse_args()
-    
-    # 1. Get JSON from DB
-    print(f"🔎 Fetching data for production: {args.production_id}")
-    json_payload = get_payload_from_db(args.production_id)
 
     if args.audit:
         print("🕵️  AUDIT MODE SELECTED")
-        ai_script = "ai-analysis_worker_v2.py"
+        ai_script = "ai_analysis_worker_v2.py"
     elif args.vision:
         print("vision")
         ai_script = "ai-vision.py"
@@ -92,23 +194,25 @@ if __name__ == "__main__":
         print("🎬  FULL PRODUCTION MODE")
         ai_script = "ai-analysis.py"
 
-    
+    ids = args.production_id
+    if len(ids) == 1:
+        sys.exit(run_analysis(ids[0], ai_script, "./workspace", args.print,
+                              in_process=not args.subprocess))
 
-    if json_payload:
-        print(f"🚀 Launching AI Analysis...")
-        
-        if args.print:
-            print(f"{json_payload}")
-            sys.exit(0)
-
-        try:
-            # Use sys.executable to guarantee we use the venv python
-            subprocess.run([
-                sys.executable,        # <--- Change 1: Uses the current venv python
-                ai_script, 
-                "--payload", json_payload,
-                "--workdir", "./workspace" # <--- Change 2: Use a local folder
-            ], check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"❌ Job failed with exit code {e.returncode}")
-            sys.exit(e.returncode)
\ No newline at end of file
+    # Each job is its own python process; threads only wait on them.
+    # (Workers keep module-level state, so batches stay out of process.)
+    # Separate workdirs so concurrent jobs don't clobber each other.
+    with ThreadPoolExecutor(max_workers=max(1, args.parallel)) as pool:
+        codes = list(pool.map(
+            lambda p: run_analysis(
+                p[1], ai_script, f"./workspace/{p[1]}", args.print,
+                delay=(p[0] % max(1, args.parallel)) * LAUNCH_STAGGER_S,
+            ),
+            enumerate(ids),
+        ))
+
+    failed = [pid for pid, code in zip(ids, codes) if code != 0]
+    if failed:
+        print(f"❌ {len(failed)}/{len(ids)} productions failed: {', '.join(failed)}")
+        sys.exit(1)
+    print(f"✅ {len(ids)} productions finished")
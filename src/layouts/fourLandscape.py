@@ -1,5 +1,7 @@
 from pathlib import Path
 
+from ffmpegCommon import NVDEC_INPUT_FLAGS, NVENC_THROUGHPUT_FLAGS
+
 
 def buildFourLandscapeCmd(localPaths, offsets, outVideo: Path):
     """
@@ -51,10 +53,10 @@ def buildFourLandscapeCmd(localPaths, offsets, outVideo: Path):
     return [
         "ffmpeg", "-y",
 
-        "-ss", f"{offsets[0]}", "-i", str(localPaths[0]),
-        "-ss", f"{offsets[1]}", "-i", str(localPaths[1]),
-        "-ss", f"{offsets[2]}", "-i", str(localPaths[2]),
-        "-ss", f"{offsets[3]}", "-i", str(localPaths[3]),
+        *NVDEC_INPUT_FLAGS, "-ss", f"{offsets[0]}", "-i", str(localPaths[0]),
+        *NVDEC_INPUT_FLAGS, "-ss", f"{offsets[1]}", "-i", str(localPaths[1]),
+        *NVDEC_INPUT_FLAGS, "-ss", f"{offsets[2]}", "-i", str(localPaths[2]),
+        *NVDEC_INPUT_FLAGS, "-ss", f"{offsets[3]}", "-i", str(localPaths[3]),
 
         "-i", LOGO,
 
@@ -64,6 +66,7 @@ def buildFourLandscapeCmd(localPaths, offsets, outVideo: Path):
         "-c:v", "hevc_nvenc",
         "-preset", "p5",
         "-rc", "vbr",
+        *NVENC_THROUGHPUT_FLAGS,
         "-b:v", "5M",
         "-maxrate", "6M",
         "-bufsize", "12M",
@@ -1,5 +1,7 @@
 from pathlib import Path
 
+from ffmpegCommon import NVDEC_INPUT_FLAGS, NVENC_LOWLATENCY_FLAGS, NVENC_THROUGHPUT_FLAGS
+
 def buildHi5TwoPortraitCmd(
     localPaths,
     offsets,
@@ -26,21 +28,25 @@ def buildHi5TwoPortraitCmd(
     flip_left = not is_left_hand
     flip_right = is_left_hand
 
-    left_flip_chain = "hflip," if flip_left else ""
-    right_flip_chain = "hflip," if flip_right else ""
+    left_flip_chain = ",hflip" if flip_left else ""
+    right_flip_chain = ",hflip" if flip_right else ""
 
+    # Each tile is cropped first (free: just an offset into the frame), then
+    # scaled once straight to canvas height and flipped at that size. The
+    # canvas scale below is then a no-op for portrait sources instead of a
+    # second full-frame resample of the stacked image.
     filtergraph = (
         # --- Input 0 (portrait, left) ---
-        "[0:v]setpts=PTS-STARTPTS,"
-        f"{left_flip_chain}"
-        "scale=-2:1080:force_original_aspect_ratio=decrease,"
-        "crop=iw:ih*" + str(CROP_FACTOR) + ":0:(ih-ih*" + str(CROP_FACTOR) + ")/2[v0];"
+        "[0:v]fps=30,setpts=PTS-STARTPTS,"
+        "crop=iw:ih*" + str(CROP_FACTOR) + ":0:(ih-ih*" + str(CROP_FACTOR) + ")/2,"
+        "scale=-2:" + str(CANVAS_H) +
+        f"{left_flip_chain}[v0];"
 
         # --- Input 1 (portrait, right) ---
-        "[1:v]setpts=PTS-STARTPTS,"
-        f"{right_flip_chain}"
-        "scale=-2:1080:force_original_aspect_ratio=decrease,"
-        "crop=iw:ih*" + str(CROP_FACTOR) + ":0:(ih-ih*" + str(CROP_FACTOR) + ")/2[v1];"
+        "[1:v]fps=30,setpts=PTS-STARTPTS,"
+        "crop=iw:ih*" + str(CROP_FACTOR) + ":0:(ih-ih*" + str(CROP_FACTOR) + ")/2,"
+        "scale=-2:" + str(CANVAS_H) +
+        f"{right_flip_chain}[v1];"
 
         # --- Side-by-side ---
         "[v0][v1]hstack=inputs=2[stacked_raw];"
@@ -57,8 +63,10 @@ def buildHi5TwoPortraitCmd(
 
     return [
         "ffmpeg", "-y",
+        *NVDEC_INPUT_FLAGS,
         "-ss", f"{voff1}",        # trim earliest-started clip
         "-i", str(clip1),
+        *NVDEC_INPUT_FLAGS,
         "-i", str(clip2),
         "-i", LOGO,
         "-filter_complex", filtergraph,
@@ -67,10 +75,12 @@ def buildHi5TwoPortraitCmd(
         "-c:v", "hevc_nvenc",
         "-preset", "p5",
         "-rc", "vbr",
+        *NVENC_THROUGHPUT_FLAGS,
+        *NVENC_LOWLATENCY_FLAGS,  # after the tail so -bf 0 wins
         "-b:v", "5M",
         "-maxrate", "6M",
         "-bufsize", "12M",
-        "-g", "60",
+        "-g", "120",
         "-profile:v", "main",
         "-pix_fmt", "yuv420p",
         "-tag:v", "hvc1",
@@ -1,5 +1,7 @@
 from pathlib import Path
 
+from ffmpegCommon import NVDEC_INPUT_FLAGS, NVENC_LOWLATENCY_FLAGS, NVENC_THROUGHPUT_FLAGS, filter_complex_args
+
 def buildMixedFourOneLandscapeCmd(localPaths, offsets, outVideo: Path):
     """
     3 portrait + 1 landscape on a PORTRAIT canvas (1080x1920)
@@ -32,19 +34,19 @@ def buildMixedFourOneLandscapeCmd(localPaths, offsets, outVideo: Path):
     LAND_CROP = 0.50
 
     filtergraph = f"""
-        [0:v]setpts=PTS-STARTPTS,
+        [0:v]fps=30,setpts=PTS-STARTPTS,
              scale={TILE_W}:{TILE_H}:force_original_aspect_ratio=decrease,
              pad={TILE_W}:{TILE_H}:(ow-iw)/2:(oh-ih)/2:{PAD}[p0];
 
-        [1:v]setpts=PTS-STARTPTS,
+        [1:v]fps=30,setpts=PTS-STARTPTS,
              scale={TILE_W}:{TILE_H}:force_original_aspect_ratio=decrease,
              pad={TILE_W}:{TILE_H}:(ow-iw)/2:(oh-ih)/2:{PAD}[p1];
 
-        [2:v]setpts=PTS-STARTPTS,
+        [2:v]fps=30,setpts=PTS-STARTPTS,
              scale={TILE_W}:{TILE_H}:force_original_aspect_ratio=decrease,
              pad={TILE_W}:{TILE_H}:(ow-iw)/2:(oh-ih)/2:{PAD}[p2];
 
-        [3:v]setpts=PTS-STARTPTS,
+        [3:v]fps=30,setpts=PTS-STARTPTS,
              crop=in_w*{LAND_CROP}:in_h:(in_w-in_w*{LAND_CROP})/2:0,
              scale={TILE_W}:{TILE_H}:force_original_aspect_ratio=decrease,
              pad={TILE_W}:{TILE_H}:(ow-iw)/2:(oh-ih)/2:{PAD}[l0];
@@ -60,24 +62,26 @@ def buildMixedFourOneLandscapeCmd(localPaths, offsets, outVideo: Path):
     return [
         "ffmpeg", "-y",
 
-        "-ss", f"{offA}", "-i", str(clipA),
-        "-ss", f"{offB}", "-i", str(clipB),
-        "-ss", f"{offC}", "-i", str(clipC),
-        "-ss", f"{offD}", "-i", str(clipD),
+        *NVDEC_INPUT_FLAGS, "-ss", f"{offA}", "-i", str(clipA),
+        *NVDEC_INPUT_FLAGS, "-ss", f"{offB}", "-i", str(clipB),
+        *NVDEC_INPUT_FLAGS, "-ss", f"{offC}", "-i", str(clipC),
+        *NVDEC_INPUT_FLAGS, "-ss", f"{offD}", "-i", str(clipD),
 
         "-i", LOGO,
 
-        "-filter_complex", filtergraph,
+        *filter_complex_args(filtergraph),
         "-map", "[outv]",
         "-r", "30000/1001",
 
         "-c:v", "hevc_nvenc",
         "-preset", "p5",
         "-rc", "vbr",
+        *NVENC_THROUGHPUT_FLAGS,
+        *NVENC_LOWLATENCY_FLAGS,  # after the tail so -bf 0 wins
         "-b:v", "5M",
         "-maxrate", "6M",
         "-bufsize", "12M",
-        "-g", "60",
+        "-g", "120",
         "-profile:v", "main",
         "-pix_fmt", "yuv420p",
         "-tag:v", "hvc1",
@@ -1,5 +1,7 @@
 from pathlib import Path
 
+from ffmpegCommon import NVDEC_INPUT_FLAGS, NVENC_LOWLATENCY_FLAGS, NVENC_THROUGHPUT_FLAGS, filter_complex_args
+
 def buildMixedFourOnePortraitCmd(localPaths, offsets, outVideo: Path):
     """
     3 landscape + 1 portrait on a LANDSCAPE canvas (1920x1080)
@@ -28,27 +30,24 @@ def buildMixedFourOnePortraitCmd(localPaths, offsets, outVideo: Path):
     PORTRAIT_H = CELL_H
 
     filtergraph = f"""
-        [0:v]setpts=PTS-STARTPTS,
+        [0:v]fps=30,setpts=PTS-STARTPTS,
              scale={CELL_W}:{CELL_H}:force_original_aspect_ratio=decrease,
              pad={CELL_W}:{CELL_H}:(ow-iw)/2:(oh-ih)/2:{PAD}[a];
 
-        [1:v]setpts=PTS-STARTPTS,
+        [1:v]fps=30,setpts=PTS-STARTPTS,
              scale={CELL_W}:{CELL_H}:force_original_aspect_ratio=decrease,
              pad={CELL_W}:{CELL_H}:(ow-iw)/2:(oh-ih)/2:{PAD}[b];
 
-        [2:v]setpts=PTS-STARTPTS,
+        [2:v]fps=30,setpts=PTS-STARTPTS,
              scale={CELL_W}:{CELL_H}:force_original_aspect_ratio=decrease,
              pad={CELL_W}:{CELL_H}:(ow-iw)/2:(oh-ih)/2:{PAD}[c];
 
-        [3:v]setpts=PTS-STARTPTS,
+        [3:v]fps=30,setpts=PTS-STARTPTS,
             crop=in_w:in_h*0.50:0:(in_h-in_h*0.50)/2,
             scale={CELL_W}:{CELL_H}:force_original_aspect_ratio=decrease,
-            pad={CELL_W}:{CELL_H}:(ow-iw)/2:(oh-ih)/2:{PAD}[l0];
-            
-        [a][b]hstack=inputs=2[top];
-        [c][d]hstack=inputs=2[bottom];
+            pad={CELL_W}:{CELL_H}:(ow-iw)/2:(oh-ih)/2:{PAD}[d];
 
-        [top][bottom]vstack=inputs=2[bg];
+        [a][b][c][d]xstack=inputs=4:layout=0_0|w0_0|0_h0|w0_h0[bg];
 
         [4:v]scale=trunc({CANVAS_W}*0.18):-1:force_original_aspect_ratio=decrease,format=rgba[logo];
         [logo]lut=a='val*0.35'[logo_half];
@@ -59,24 +58,26 @@ def buildMixedFourOnePortraitCmd(localPaths, offsets, outVideo: Path):
     return [
         "ffmpeg", "-y",
 
-        "-ss", f"{offA}", "-i", str(clipA),
-        "-ss", f"{offB}", "-i", str(clipB),
-        "-ss", f"{offC}", "-i", str(clipC),
-        "-ss", f"{offD}", "-i", str(clipD),
+        *NVDEC_INPUT_FLAGS, "-ss", f"{offA}", "-i", str(clipA),
+        *NVDEC_INPUT_FLAGS, "-ss", f"{offB}", "-i", str(clipB),
+        *NVDEC_INPUT_FLAGS, "-ss", f"{offC}", "-i", str(clipC),
+        *NVDEC_INPUT_FLAGS, "-ss", f"{offD}", "-i", str(clipD),
 
         "-i", LOGO,
 
-        "-filter_complex", filtergraph,
+        *filter_complex_args(filtergraph),
         "-map", "[outv]",
         "-r", "30000/1001",
 
         "-c:v", "hevc_nvenc",
         "-preset", "p5",
         "-rc", "vbr",
+        *NVENC_THROUGHPUT_FLAGS,
+        *NVENC_LOWLATENCY_FLAGS,  # after the tail so -bf 0 wins
         "-b:v", "5M",
         "-maxrate", "6M",
         "-bufsize", "12M",
-        "-g", "60",
+        "-g", "120",
         "-profile:v", "main",
         "-pix_fmt", "yuv420p",
         "-tag:v", "hvc1",
@@ -1,5 +1,7 @@
 from pathlib import Path
 
+from ffmpegCommon import NVDEC_INPUT_FLAGS, NVENC_LOWLATENCY_FLAGS, NVENC_THROUGHPUT_FLAGS, filter_complex_args
+
 def buildMixedFourTwoLandscapeCmd(localPaths, offsets, outVideo: Path):
     """
     2 landscape (top stacked) + 2 portrait (bottom side-by-side)
@@ -22,28 +24,25 @@ def buildMixedFourTwoLandscapeCmd(localPaths, offsets, outVideo: Path):
     LAND_CROP = 0.50  # aggressive vertical crop
 
     filtergraph = f"""
-        [0:v]setpts=PTS-STARTPTS,
+        [0:v]fps=30,setpts=PTS-STARTPTS,
              crop=in_w:in_h*{LAND_CROP}:0:(in_h-in_h*{LAND_CROP})/2,
              scale={CANVAS_W}:{TOP_H}:force_original_aspect_ratio=decrease,
              pad={CANVAS_W}:{TOP_H}:(ow-iw)/2:(oh-ih)/2:{PAD}[l0];
 
-        [1:v]setpts=PTS-STARTPTS,
+        [1:v]fps=30,setpts=PTS-STARTPTS,
              crop=in_w:in_h*{LAND_CROP}:0:(in_h-in_h*{LAND_CROP})/2,
              scale={CANVAS_W}:{TOP_H}:force_original_aspect_ratio=decrease,
              pad={CANVAS_W}:{TOP_H}:(ow-iw)/2:(oh-ih)/2:{PAD}[l1];
 
-        [2:v]setpts=PTS-STARTPTS,
+        [2:v]fps=30,setpts=PTS-STARTPTS,
              scale={PORT_W}:{BOTTOM_H}:force_original_aspect_ratio=decrease,
              pad={PORT_W}:{BOTTOM_H}:(ow-iw)/2:(oh-ih)/2:{PAD}[p0];
 
-        [3:v]setpts=PTS-STARTPTS,
+        [3:v]fps=30,setpts=PTS-STARTPTS,
              scale={PORT_W}:{BOTTOM_H}:force_original_aspect_ratio=decrease,
              pad={PORT_W}:{BOTTOM_H}:(ow-iw)/2:(oh-ih)/2:{PAD}[p1];
 
-        [l0][l1]vstack=inputs=2[top];
-        [p0][p1]hstack=inputs=2[bottom];
-
-        [top][bottom]vstack=inputs=2[stacked];
+        [l0][l1][p0][p1]xstack=inputs=4:layout=0_0|0_h0|0_h0+h1|w2_h0+h1[stacked];
 
         [4:v]scale=trunc({CANVAS_W}*0.20):-1:force_original_aspect_ratio=decrease,format=rgba[logo];
         [logo]lut=a='val*0.25'[logo_half];
@@ -54,23 +53,25 @@ def buildMixedFourTwoLandscapeCmd(localPaths, offsets, outVideo: Path):
     return [
         "ffmpeg", "-y",
 
-        "-ss", f"{o1}", "-i", str(l1),
-        "-ss", f"{o2}", "-i", str(l2),
-        "-ss", f"{o3}", "-i", str(p1),
-        "-ss", f"{o4}", "-i", str(p2),
+        *NVDEC_INPUT_FLAGS, "-ss", f"{o1}", "-i", str(l1),
+        *NVDEC_INPUT_FLAGS, "-ss", f"{o2}", "-i", str(l2),
+        *NVDEC_INPUT_FLAGS, "-ss", f"{o3}", "-i", str(p1),
+        *NVDEC_INPUT_FLAGS, "-ss", f"{o4}", "-i", str(p2),
         "-i", LOGO,
 
-        "-filter_complex", filtergraph,
+        *filter_complex_args(filtergraph),
         "-map", "[outv]",
         "-r", "30000/1001",
 
         "-c:v", "hevc_nvenc",
         "-preset", "p5",
         "-rc", "vbr",
+        *NVENC_THROUGHPUT_FLAGS,
+        *NVENC_LOWLATENCY_FLAGS,  # after the tail so -bf 0 wins
         "-b:v", "5M",
         "-maxrate", "6M",
         "-bufsize", "12M",
-        "-g", "60",
+        "-g", "120",
         "-profile:v", "main",
         "-pix_fmt", "yuv420p",
         "-tag:v", "hvc1",
@@ -1,5 +1,7 @@
 from pathlib import Path
 
+from ffmpegCommon import NVDEC_INPUT_FLAGS, NVENC_THROUGHPUT_FLAGS, TIMELINE_NVENC_PRESET
+
 
 def buildMixedThreeTwoLandscapeCmd(
     localPaths,
@@ -7,6 +9,7 @@ def buildMixedThreeTwoLandscapeCmd(
     startTimes,
     baseDuration,
     outVideo: Path,
+    preset=TIMELINE_NVENC_PRESET,
 ):
     """
     1 portrait + 2 landscape → portrait canvas (1080x1920)
@@ -74,8 +77,7 @@ def buildMixedThreeTwoLandscapeCmd(
             crop={CANVAS_W}:{BOT_H}
             [b1];
 
-        [b0][b1]vstack=inputs=2[bottom];
-        [top][bottom]vstack=inputs=2[layout];
+        [top][b0][b1]xstack=inputs=3:layout=0_0|0_h0|0_h0+h1[layout];
         [base][layout]overlay=0:0:eof_action=pass[bg];
 
         [3:v]scale=iw*{LOGO_SCALE}:-1:force_original_aspect_ratio=decrease,format=rgba[logo];
@@ -87,17 +89,20 @@ def buildMixedThreeTwoLandscapeCmd(
     return [
         "ffmpeg", "-y",
 
-        "-i", str(localPaths[0]),
-        "-i", str(localPaths[1]),
-        "-i", str(localPaths[2]),
+        *NVDEC_INPUT_FLAGS, "-i", str(localPaths[0]),
+        *NVDEC_INPUT_FLAGS, "-i", str(localPaths[1]),
+        *NVDEC_INPUT_FLAGS, "-i", str(localPaths[2]),
         "-i", LOGO,
 
         "-filter_complex", filtergraph,
         "-map", "[outv]",
 
         "-c:v", "hevc_nvenc",
-        "-preset", "p5",
+        "-preset", preset,
+        "-tune", "hq",
+        "-multipass", "qres",
         "-rc", "vbr",
+        *NVENC_THROUGHPUT_FLAGS,
         "-b:v", "5M",
         "-maxrate", "6M",
         "-bufsize", "12M",
@@ -1,5 +1,7 @@
 from pathlib import Path
 
+from ffmpegCommon import NVDEC_INPUT_FLAGS, NVENC_THROUGHPUT_FLAGS, TIMELINE_NVENC_PRESET
+
 
 def buildMixedThreeTwoPortraitCmd(
     localPaths,
@@ -7,6 +9,7 @@ def buildMixedThreeTwoPortraitCmd(
     startTimes,
     baseDuration,
     outVideo: Path,
+    preset=TIMELINE_NVENC_PRESET,
 ):
     """
     2 portrait + 1 landscape → portrait canvas (1080x1920)
@@ -54,14 +57,12 @@ def buildMixedThreeTwoPortraitCmd(
             pad={TOP_W_EACH}:{TOP_H}:(ow-iw)/2:(oh-ih)/2:{PAD}
             [p1v];
 
-        [p0v][p1v]hstack=inputs=2[top];
-
         [{l0}:v]setpts=PTS-STARTPTS+{t_l0}/TB,
             scale={CANVAS_W}:{BOTTOM_H}:force_original_aspect_ratio=decrease,
             pad={CANVAS_W}:{BOTTOM_H}:(ow-iw)/2:(oh-ih)/2:{PAD}
             [bottom];
 
-        [top][bottom]vstack=inputs=2[layout];
+        [p0v][p1v][bottom]xstack=inputs=3:layout=0_0|w0_0|0_h0[layout];
         [base][layout]overlay=0:0:eof_action=pass[bg];
 
         [3:v]scale=trunc({CANVAS_W}*{LOGO_SCALE}):-1:force_original_aspect_ratio=decrease,format=rgba[logo];
@@ -74,17 +75,20 @@ def buildMixedThreeTwoPortraitCmd(
     return [
         "ffmpeg", "-y",
 
-        "-i", str(localPaths[0]),
-        "-i", str(localPaths[1]),
-        "-i", str(localPaths[2]),
+        *NVDEC_INPUT_FLAGS, "-i", str(localPaths[0]),
+        *NVDEC_INPUT_FLAGS, "-i", str(localPaths[1]),
+        *NVDEC_INPUT_FLAGS, "-i", str(localPaths[2]),
         "-i", LOGO,
 
         "-filter_complex", filtergraph,
         "-map", "[outv]",
 
         "-c:v", "hevc_nvenc",
-        "-preset", "p5",
+        "-preset", preset,
+        "-tune", "hq",
+        "-multipass", "qres",
         "-rc", "vbr",
+        *NVENC_THROUGHPUT_FLAGS,
         "-b:v", "5M",
         "-maxrate", "6M",
         "-bufsize", "12M",
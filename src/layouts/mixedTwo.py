@@ -1,11 +1,14 @@
 from pathlib import Path
 
+from ffmpegCommon import NVDEC_INPUT_FLAGS, NVENC_THROUGHPUT_FLAGS, TIMELINE_NVENC_PRESET
+
 def buildMixedTwoCmd(
     localPaths,
     orientations,
     startTimes,      # timeline start times (seconds)
     baseDuration,    # total timeline duration (seconds)
     outVideo: Path,
+    preset=TIMELINE_NVENC_PRESET,
 ):
     clip1, clip2 = localPaths
 
@@ -62,8 +65,8 @@ def buildMixedTwoCmd(
     return [
         "ffmpeg", "-y",
 
-        "-i", str(clip1),
-        "-i", str(clip2),
+        *NVDEC_INPUT_FLAGS, "-i", str(clip1),
+        *NVDEC_INPUT_FLAGS, "-i", str(clip2),
         "-i", LOGO,
 
         "-filter_complex", filtergraph,
@@ -73,14 +76,15 @@ def buildMixedTwoCmd(
         "-video_track_timescale", "90000",
 
         "-c:v", "hevc_nvenc",
-        "-preset", "p5",
+        "-preset", preset,
+        "-tune", "hq",
+        "-multipass", "qres",
         "-rc", "vbr",
+        *NVENC_THROUGHPUT_FLAGS,
         "-b:v", "5M",
         "-maxrate", "6M",
         "-bufsize", "12M",
         "-g", "60",
-        "-bf", "0",        # ✅ NO B-FRAMES → no decode delay
-        "-refs", "1",     # ✅ single reference frame (optional but helps latency)
         "-profile:v", "main",
         "-pix_fmt", "yuv420p",
         "-tag:v", "hvc1",
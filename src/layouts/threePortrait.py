@@ -1,11 +1,14 @@
 # layouts/threePortrait.py
 from pathlib import Path
 
+from ffmpegCommon import NVDEC_INPUT_FLAGS, NVENC_THROUGHPUT_FLAGS, TIMELINE_NVENC_PRESET
+
 def buildThreePortraitCmd(
     localPaths,
     startTimes,
     baseDuration,
     outVideo: Path,
+    preset=TIMELINE_NVENC_PRESET,
 ):
     clip1, clip2, clip3 = localPaths
 
@@ -61,17 +64,20 @@ def buildThreePortraitCmd(
     return [
         "ffmpeg", "-y",
 
-        "-i", str(clip1),
-        "-i", str(clip2),
-        "-i", str(clip3),
+        *NVDEC_INPUT_FLAGS, "-i", str(clip1),
+        *NVDEC_INPUT_FLAGS, "-i", str(clip2),
+        *NVDEC_INPUT_FLAGS, "-i", str(clip3),
         "-i", LOGO,
 
         "-filter_complex", filtergraph,
         "-map", "[outv]",
 
         "-c:v", "hevc_nvenc",
-        "-preset", "p5",
+        "-preset", preset,
+        "-tune", "hq",
+        "-multipass", "qres",
         "-rc", "vbr",
+        *NVENC_THROUGHPUT_FLAGS,
         "-b:v", "5M",
         "-maxrate", "6M",
         "-bufsize", "12M",
@@ -1,6 +1,8 @@
 # layouts/twoLandscape.py
 from pathlib import Path
 
+from ffmpegCommon import NVDEC_INPUT_FLAGS, NVENC_THROUGHPUT_FLAGS
+
 def buildTwoLandscapeCmd(localPaths, startTimes, outVideo: Path, baseDuration):
     """
     2-landscape TIMELINE layout:
@@ -61,8 +63,8 @@ def buildTwoLandscapeCmd(localPaths, startTimes, outVideo: Path, baseDuration):
     return [
         "ffmpeg", "-y",
 
-        "-i", str(clip1),
-        "-i", str(clip2),
+        *NVDEC_INPUT_FLAGS, "-i", str(clip1),
+        *NVDEC_INPUT_FLAGS, "-i", str(clip2),
         "-i", LOGO,
 
         "-filter_complex", filtergraph,
@@ -74,6 +76,7 @@ def buildTwoLandscapeCmd(localPaths, startTimes, outVideo: Path, baseDuration):
         "-c:v", "hevc_nvenc",
         "-preset", "p5",
         "-rc", "vbr",
+        *NVENC_THROUGHPUT_FLAGS,
         "-b:v", "5M",
         "-maxrate", "6M",
         "-bufsize", "12M",
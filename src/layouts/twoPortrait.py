@@ -1,6 +1,8 @@
 from pathlib import Path
 
-def buildTwoPortraitCmd(localPaths, startTimes, outVideo: Path, baseDuration):
+from ffmpegCommon import NVDEC_INPUT_FLAGS, NVENC_THROUGHPUT_FLAGS, TIMELINE_NVENC_PRESET
+
+def buildTwoPortraitCmd(localPaths, startTimes, outVideo: Path, baseDuration, preset=TIMELINE_NVENC_PRESET):
     clip1, clip2 = localPaths
 
     CANVAS_W = 1400
@@ -48,8 +50,8 @@ def buildTwoPortraitCmd(localPaths, startTimes, outVideo: Path, baseDuration):
     return [
         "ffmpeg", "-y",
 
-        "-i", str(clip1),
-        "-i", str(clip2),
+        *NVDEC_INPUT_FLAGS, "-i", str(clip1),
+        *NVDEC_INPUT_FLAGS, "-i", str(clip2),
         "-i", LOGO,
 
         "-filter_complex", filtergraph,
@@ -60,14 +62,15 @@ def buildTwoPortraitCmd(localPaths, startTimes, outVideo: Path, baseDuration):
         "-video_track_timescale", "90000",
 
         "-c:v", "hevc_nvenc",
-        "-preset", "p5",
+        "-preset", preset,
+        "-tune", "hq",
+        "-multipass", "qres",
         "-rc", "vbr",
+        *NVENC_THROUGHPUT_FLAGS,
         "-b:v", "5M",
         "-maxrate", "6M",
         "-bufsize", "12M",
         "-g", "60",
-        "-bf", "0",        # ✅ NO B-FRAMES → no decode delay
-        "-refs", "1",     # ✅ single reference frame (optional but helps latency)
         "-profile:v", "main",
         "-pix_fmt", "yuv420p",
         "-tag:v", "hvc1",
@@ -8,7 +8,8 @@ productionJob.py (updated)
   then stitching segments (ordered by segmentIndex) and muxing audio (if present),
   writing canonical:
     gs://{bucket}/clips/{clipId}_master.mp4
-- Then proceeds with existing render + audio pipeline.
+- Then proceeds with existing render + audio pipeline (audio is mixed on the
+  CPU while the NVENC video render runs, then stream-copied in the mux).
 
 IMPORTANT:
 - This file assumes your ffmpegAudioTools.py has the "timeline-safe" version:
@@ -26,15 +27,14 @@ from pathlib import Path
 from google.cloud import storage
 
 # Helper imports
-from ffmpegVideoRender import renderFinalVideo
+from ffmpegVideoRender import buildFinalVideoCmd
 from ffmpegAudioTools import (
-    extractAudioTrimmed,
-    extractAudioUntrimmed,
-    mixAudioTracksTrim,
-    mixAudioTracksTimeline,
-    muxVideoAudio,
-    muxVideoWithTimelineAudio,
+    extractAudioTracksCmds,
+    mixAudioTracksTrimCmd,
+    mixAudioTracksTimelineCmd,
+    muxVideoAudioCmd,
 )
+from ffmpegCommon import FfmpegDAG
 
 def get_segment_duration_seconds(path: Path) -> float:
     try:
@@ -356,9 +356,11 @@ def ensure_clip_finalized(bucket_name: str, clip_id: str, client, workdir: Path)
     Builds:
       - local video-only clip (for production timing)
       - local master clip (video + audio, for upload)
+      - local aligned audio-only track, when the clip has audio (for the
+        production's audio pass, so it doesn't re-read the master's video)
 
     Uploads only the master.
-    Returns (local_video_only_path, local_master_path)
+    Returns (local_video_only_path, local_master_path, local_audio_path | None)
     """
 
     print(f"🧵 Finalizing clip {clip_id}...")
@@ -478,13 +480,14 @@ def ensure_clip_finalized(bucket_name: str, clip_id: str, client, workdir: Path)
 
     else:
         local_master = local_video_only
+        aligned_audio = None
 
     # Upload only MASTER
     master_gcs = f"clips/{clip_id}_master.mp4"
     uploadToGCS(bucket_name, master_gcs, local_master, client)
     print(f"⬆️ MASTER written: gs://{bucket_name}/{master_gcs}")
 
-    return local_video_only, local_master
+    return local_video_only, local_master, aligned_audio
 
 # -----------------------------
 # Main job
@@ -514,7 +517,7 @@ def run_job(
     # 1. Ensure canonical clips exist + download inputs
     # ---------------------------------------------------------
     local_video_paths: list[Path] = []
-    local_master_paths: list[Path] = []
+    local_audio_paths: list[Path] = []  # audio-only track, else the master
     orientations: list[str] = []
     start_times_abs: list[float] = []
     clip_ids: list[str] = []
@@ -525,11 +528,11 @@ def run_job(
             orient = inp["orientation"].lower().strip()
             start_time_str = inp["startTime"]
 
-            local_video_only, local_master = ensure_clip_finalized(
+            local_video_only, local_master, local_audio = ensure_clip_finalized(
             bucket_name, clip_id, client, workdir)
 
             local_video_paths.append(local_video_only)
-            local_master_paths.append(local_master)
+            local_audio_paths.append(local_audio or local_master)
 
             orientations.append(orient)
             start_times_abs.append(parse_iso_utc(start_time_str))
@@ -547,7 +550,7 @@ def run_job(
     trim_offsets = [max(0.0, latest - t) for t in start_times_abs]
 
     # ---------------------------------------------------------
-    # 3. Render Video Track (silent)
+    # 3. Plan Video Track render (silent, NVENC)
     # ---------------------------------------------------------
     final_video_track = workdir / "final_video_track.mp4"
     metadata = {}
@@ -560,9 +563,7 @@ def run_job(
 
         print(f"🧮 clip_durations={clip_durations}")
 
-        print(f"🎥 Rendering video track... base_duration={base_duration:.3f}s")
-
-        render_mode = renderFinalVideo(
+        video_cmd, render_mode = buildFinalVideoCmd(
             local_video_paths,
             orientations,
             trim_offsets,          # offsets (trim)
@@ -580,80 +581,94 @@ def run_job(
             start_times = timeline_starts  # still useful later
             offsets = trim_offsets
 
-        metadata = get_video_metadata(final_video_track)
-        print(f"📏 Metadata extracted: {metadata}")
-
     except Exception as e:
         raise RuntimeError(f"Video render failed: {e}")
 
-    assert final_video_track.exists(), f"Video missing: {final_video_track}"
-    assert final_video_track.stat().st_size > 0, "Video file is empty"
-
     # ---------------------------------------------------------
-    # 4. Process Audio & Mux
+    # 4. Video, Audio & Mux as one ffmpeg DAG
     # ---------------------------------------------------------
-    primary_output_path: Path | None = None
-    uploaded_outputs: list[str] = []
+    # Audio reads only the per-camera audio tracks, never the rendered video,
+    # so it runs on the CPU while NVENC encodes; each mux waits for both and
+    # is a stream copy (every audio file here is AAC).
+    n_outputs = len(output_gcs_paths)
+    dag = FfmpegDAG()
 
-    try:
-        print("🔊 Processing audio...")
-
-        # Extract audio from source clips into .m4a (NOT .aac)
-        audio_files: list[Path] = []
-        for i, master_path in enumerate(local_master_paths):
-            audio_out = workdir / f"audio_track_{i}.m4a"
-            if render_mode == "trim":
-                extractAudioTrimmed(master_path, audio_out, offsets[i])
-            else:
-                extractAudioUntrimmed(master_path, audio_out)
-            audio_files.append(audio_out)
-
-        n_outputs = len(output_gcs_paths)
-
-        # Strategy A: Mixed Audio (1 Output)
-        if n_outputs == 1:
-            mixed_audio = workdir / "mixed_audio.m4a"
-
-            if render_mode == "trim":
-                mixAudioTracksTrim(audio_files, mixed_audio)
-            else:
-                # TIMELINE: must cap to base_duration to avoid infinite mix
-                mixAudioTracksTimeline(audio_files, mixed_audio, offsets, target_duration=base_duration)
-
-            final_output = workdir / "final_output.mp4"
-            muxVideoAudio(final_video_track, mixed_audio, final_output)
-
-            print(f"⬆️ Uploading to {output_gcs_paths[0]}...")
-            uploadToGCS(bucket_name, output_gcs_paths[0], final_output, client)
-            uploaded_outputs.append(output_gcs_paths[0])
-            primary_output_path = final_output
-
-        # Strategy B: Separate Outputs (N Outputs)
+    video_node = dag.add(video_cmd)
+
+    if n_outputs == 1:
+        # Strategy A: one mixed track straight from the camera audio
+        audio_files = [workdir / "mixed_audio.m4a"]
+
+        if render_mode == "trim":
+            audio_cmds = [mixAudioTracksTrimCmd(local_audio_paths, audio_files[0], offsets=offsets)]
         else:
-            for i, out_gcs_path in enumerate(output_gcs_paths):
-                final_output = workdir / f"final_output_{i}.mp4"
+            # TIMELINE: must cap to base_duration to avoid infinite mix
+            audio_cmds = [mixAudioTracksTimelineCmd(
+                local_audio_paths,
+                audio_files[0],
+                offsets,
+                target_duration=base_duration,
+            )]
+    else:
+        # Strategy B: one track per camera, extracted into .m4a (NOT .aac).
+        # Timeline mode bakes each camera's start delay in here so the
+        # per-output mux is a stream copy, not another AAC encode.
+        audio_files = [workdir / f"audio_track_{i}.m4a" for i in range(len(local_audio_paths))]
+        audio_cmds = extractAudioTracksCmds([
+            (
+                audio_src,
+                audio_out,
+                offsets[i] if render_mode == "trim" else None,
+                0.0 if render_mode == "trim" else start_times[i],
+            )
+            for i, (audio_src, audio_out) in enumerate(zip(local_audio_paths, audio_files))
+        ], pad_to=None if render_mode == "trim" else base_duration)
+
+    audio_nodes = [dag.add(cmd, capture=True) for cmd in audio_cmds]
 
-                if render_mode == "trim":
-                    muxVideoAudio(final_video_track, audio_files[i], final_output)
-                else:
-                    muxVideoWithTimelineAudio(final_video_track, audio_files[i], start_times[i], final_output)
+    if n_outputs == 1:
+        final_outputs = [workdir / "final_output.mp4"]
+    else:
+        final_outputs = [workdir / f"final_output_{i}.mp4" for i in range(n_outputs)]
 
-                print(f"⬆️ Uploading variation {i} to {out_gcs_path}...")
-                uploadToGCS(bucket_name, out_gcs_path, final_output, client)
-                uploaded_outputs.append(out_gcs_path)
+    for final_output, audio_file in zip(final_outputs, audio_files):
+        dag.add(
+            muxVideoAudioCmd(final_video_track, audio_file, final_output, copy_audio=True),
+            deps=[video_node, *audio_nodes],
+            capture=True,
+        )
 
-                if i == 0:
-                    primary_output_path = final_output
+    try:
+        print(f"🎥🔊 Rendering video + audio... base_duration={base_duration:.3f}s")
+        dag.run()
+
+        metadata = get_video_metadata(final_video_track)
+        print(f"📏 Metadata extracted: {metadata}")
 
     except Exception as e:
-        raise RuntimeError(f"Audio/Mux processing failed: {e}")
+        raise RuntimeError(f"Render/Audio/Mux processing failed: {e}")
+
+    assert final_video_track.exists(), f"Video missing: {final_video_track}"
+    assert final_video_track.stat().st_size > 0, "Video file is empty"
+
+    # ---------------------------------------------------------
+    # 5. Upload
+    # ---------------------------------------------------------
+    primary_output_path: Path | None = final_outputs[0]
+    uploaded_outputs: list[str] = []
+
+    for i, (out_gcs_path, final_output) in enumerate(zip(output_gcs_paths, final_outputs)):
+        print(f"⬆️ Uploading variation {i} to {out_gcs_path}...")
+        uploadToGCS(bucket_name, out_gcs_path, final_output, client)
+        uploaded_outputs.append(out_gcs_path)
 
     # ---------------------------------------------------------
-    # 5. Generate Thumbnail(s)
+    # 6. Generate Thumbnail(s)
     # ---------------------------------------------------------
     try:
         print("🖼️ Generating thumbnail...")
-        duration = get_video_duration_seconds(str(final_video_track))
+        # Already probed with the metadata above; only re-probe if that failed
+        duration = metadata["duration"] or get_video_duration_seconds(str(final_video_track))
         thumb_time = choose_thumbnail_time(duration)
 
         extract_thumbnail(
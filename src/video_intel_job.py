@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 import argparse
 import sys
-import json
+import orjson
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
 from google.cloud import videointelligence
@@ -18,10 +18,10 @@ CAM_WIDE = 1
 CAM_CLOSE_A = 0
 CAM_CLOSE_B = 2
 
-def run_video_intel_job(payload_json_str, workdir_str="/workspace"):
+def run_video_intel_job(payload_json_str, workdir_str="/workspace", debug_local=False):
     try:
-        payload = json.loads(payload_json_str)
-    except json.JSONDecodeError as e:
+        payload = orjson.loads(payload_json_str)
+    except orjson.JSONDecodeError as e:
         raise ValueError(f"Invalid JSON Payload: {e}")
 
     bucket_name = payload.get("bucket")
@@ -167,22 +167,26 @@ def run_video_intel_job(payload_json_str, workdir_str="/workspace"):
         }
     }
     
-    output_filename = f"analysis_{production_id}.json"
-    local_output_path = workdir / output_filename
-    with open(local_output_path, 'w') as f:
-        json.dump(final_output, f, indent=2)
+    if debug_local:
+        local_output_path = workdir / f"analysis_{production_id}.json"
+        with open(local_output_path, 'wb') as f:
+            f.write(orjson.dumps(final_output, option=orjson.OPT_INDENT_2))
 
     gcs_output_path = f"productions/{production_id}/analysis.json"
     print(f"⬆️ Uploading results...")
-    storage_client.bucket(bucket_name).blob(gcs_output_path).upload_from_filename(str(local_output_path))
+    storage_client.bucket(bucket_name).blob(gcs_output_path).upload_from_string(
+        orjson.dumps(final_output),
+        content_type="application/json",
+    )
     print(f"✅ Video Intel Job Complete.")
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--payload", required=True)
     parser.add_argument("--workdir", default="/workspace")
+    parser.add_argument("--debug-local", action="store_true")
     args = parser.parse_args()
-    run_video_intel_job(args.payload, args.workdir)
+    run_video_intel_job(args.payload, args.workdir, debug_local=args.debug_local)
 
 if __name__ == "__main__":
     sys.exit(main())
\ No newline at end of file